@@ -1,44 +1,177 @@
 # bert_eval.py
+# Evaluation harness: answers the test queries through the async pipeline with a concurrency
+# cap, appends every answer (with its per-stage timings) to a JSONL checkpoint so an
+# interrupted run resumes where it stopped, then scores everything with batched BERTScore
+# and reports p50/p95/p99 latency per pipeline stage. Repeated queries are answered once;
+# the copies are recorded as "shared" and left out of the latency percentiles.
+#   python bert_eval.py --concurrency 16
+#   python bert_eval.py --fresh --cold-cache --limit 200
+import os
 import json
-import torch
-from bert_score import score
-from rag.langchain_pipeline import answer_query
+import time
+import asyncio
+import argparse
+import tempfile
 
-TEST_FILE = "data/test_queries.json"
+import numpy as np
 
-def main():
-    with open(TEST_FILE, "r", encoding="utf-8") as f:
-        test_data = json.load(f)
+TEST_FILE = "Data/test_queries.json"
+CHECKPOINT = "eval/answers.jsonl"
+CONCURRENCY = 8
+SCORE_BATCH_SIZE = 64
+PERCENTILES = (50, 95, 99)
+
+
+def load_checkpoint(path: str, items: list) -> dict:
+    """
+    Returns {query index: record} for answers already in the checkpoint. A line cut off by
+    an interrupted write is ignored, as is a record whose query no longer matches the file.
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            i = record.get("i")
+            if isinstance(i, int) and i < len(items) and items[i]["query"] == record.get("query"):
+                done[i] = record
+    return done
+
+
+async def answer_all(items: list, done: dict, path: str, concurrency: int) -> int:
+    from rag.async_pipeline import answer_query_async
+    from rag.lang_detect import detect_language
+    from rag.langchain_pipeline import NOT_LOADED
+    from rag.name_index import normalize
+    from rag.stage_timing import collect
 
-    candidate_answers = []
-    reference_answers = []
+    todo = [i for i in range(len(items)) if i not in done]
+    # Same key the pipeline's single-flight uses: concurrent copies of a query would share one
+    # run and come back without stage timings, so each distinct query is answered once
+    groups = {}
+    for i in todo:
+        query = items[i]["query"]
+        groups.setdefault((detect_language(query), normalize(query)), []).append(i)
+    print(f"📝 {len(done)} answers in {path}, {len(todo)} to go ({len(groups)} distinct, concurrency {concurrency})")
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = 0
+    started = time.perf_counter()
 
-    for i, item in enumerate(test_data, 1):
-        query = item["query"]
-        reference = item["reference"]
+    with open(path, "a", encoding="utf-8") as out:
+        async def one(indices: list):
+            nonlocal failed
+            query = items[indices[0]]["query"]
+            async with semaphore:
+                with collect() as stages:
+                    start = time.perf_counter()
+                    try:
+                        answer = await answer_query_async(query)
+                    except Exception as e:
+                        answer, error = None, e
+                    total = time.perf_counter() - start
+            if answer is None or answer == NOT_LOADED:
+                # Not checkpointed, so the next run retries it
+                failed += len(indices)
+                print(f"❌ [{indices[0]}] {query[:60]}: {error if answer is None else answer}")
+                return
+            for n, i in enumerate(indices):
+                record = {"i": i, "query": items[i]["query"], "lang": detect_language(items[i]["query"]),
+                          "answer": answer, "stages": stages, "total": total}
+                if n:
+                    record["shared"] = True
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                done[i] = record
+            out.flush()
+            if len(done) % 50 < len(indices):
+                print(f"  {len(done)}/{len(items)} answered")
 
-        # Get bot's answer
-        bot_answer = answer_query(query)
+        await asyncio.gather(*(one(indices) for indices in groups.values()))
 
-        candidate_answers.append(bot_answer)
-        reference_answers.append(reference)
+    elapsed = time.perf_counter() - started
+    if todo:
+        print(f"⏱️ {len(todo) - failed} answers in {elapsed:.1f}s ({(len(todo) - failed) / elapsed:.2f} queries/s), "
+              f"{failed} failed")
+    return failed
 
-        print(f"[{i}] Query: {query}")
-        print(f"Bot Answer: {bot_answer[:80]}...")
-        print(f"Reference: {reference[:80]}...")
-        print("-" * 60)
 
-    # Compute BERTScore
-    P, R, F1 = score(candidate_answers, reference_answers, lang="en", verbose=True)
+def latency_report(records: list) -> str:
+    from rag.stage_timing import STAGES
+
+    records = [r for r in records if not r.get("shared")]
+    lines = [f"⏱️ Latency per stage over {len(records)} distinct answers (ms)",
+             f"  {'stage':<15}{'n':>6}" + "".join(f"{f'p{q}':>10}" for q in PERCENTILES)]
+    for name in STAGES + ("total",):
+        values = [r["total"] if name == "total" else r["stages"][name] for r in records
+                  if name == "total" or name in r["stages"]]
+        if not values:
+            continue
+        ms = np.percentile(np.array(values) * 1000, PERCENTILES)
+        lines.append(f"  {name:<15}{len(values):>6}" + "".join(f"{v:>10.1f}" for v in ms))
+    return "\n".join(lines)
+
+
+def bert_scores(records: list, items: list, batch_size: int):
+    import torch
+    from bert_score import score
+
+    # GPU হলে এটা use হবে
+    print("⚡ Using GPU for BERTScore" if torch.cuda.is_available() else "🐢 Using CPU for BERTScore")
+    candidates = [r["answer"] for r in records]
+    references = [items[r["i"]]["reference"] for r in records]
+    P, R, F1 = score(candidates, references, lang="en", batch_size=batch_size, verbose=True)
 
     print(f"\n📊 Average Precision: {P.mean().item():.4f}")
     print(f"📊 Average Recall:    {R.mean().item():.4f}")
     print(f"📊 Average F1 Score:  {F1.mean().item():.4f}")
+    for lang in sorted({r["lang"] for r in records}):
+        mask = torch.tensor([r["lang"] == lang for r in records])
+        print(f"   {lang}: F1 {F1[mask].mean().item():.4f} over {int(mask.sum())} queries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BERTScore + per-stage latency evaluation")
+    parser.add_argument("--test-file", default=TEST_FILE)
+    parser.add_argument("--checkpoint", default=CHECKPOINT)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--limit", type=int, default=None, help="only the first N queries")
+    parser.add_argument("--fresh", action="store_true", help="discard the checkpoint and answer everything again")
+    parser.add_argument("--cold-cache", action="store_true",
+                        help="use an empty answer cache, so cached answers from earlier runs don't skew latency")
+    parser.add_argument("--batch-size", type=int, default=SCORE_BATCH_SIZE, help="BERTScore batch size")
+    parser.add_argument("--no-score", action="store_true", help="latency only, skip BERTScore")
+    args = parser.parse_args()
+
+    if args.cold_cache:
+        # Read when rag.answer_cache is imported, so set it before the pipeline loads
+        os.environ["ANSWER_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "answers.sqlite")
+
+    with open(args.test_file, "r", encoding="utf-8") as f:
+        items = json.load(f)[:args.limit]
+
+    if os.path.dirname(args.checkpoint):
+        os.makedirs(os.path.dirname(args.checkpoint), exist_ok=True)
+    if args.fresh and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    done = load_checkpoint(args.checkpoint, items)
+
+    if len(done) < len(items):
+        from rag import langchain_pipeline
+        # Load the models first so model start-up isn't counted as query latency
+        langchain_pipeline.warm_up()
+        asyncio.run(answer_all(items, done, args.checkpoint, args.concurrency))
+
+    records = [done[i] for i in sorted(done)]
+    if not records:
+        print("⚠️ No answers to evaluate")
+        return
+    print(latency_report(records))
+    if not args.no_score:
+        bert_scores(records, items, args.batch_size)
+
 
 if __name__ == "__main__":
-    # GPU হলে এটা use হবে
-    if torch.cuda.is_available():
-        print("⚡ Using GPU for BERTScore")
-    else:
-        print("🐢 Using CPU for BERTScore")
     main()
@@ -1,26 +1,51 @@
 from typing import Final
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import (
-    ApplicationBuilder, CommandHandler, MessageHandler,
-    CallbackQueryHandler, filters, ContextTypes
-)
+import asyncio
+from tools.startup import timed, report as startup_report
+from tools import metrics
+with timed("import telegram"):
+    from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+    from telegram.error import BadRequest
+    from telegram.ext import (
+        ApplicationBuilder, CommandHandler, MessageHandler,
+        CallbackQueryHandler, filters, ContextTypes
+    )
 from dotenv import load_dotenv
 import os
-from rag.langchain_pipeline import answer_query
-from tools.ocr_reader import extract_text_from_image
-from tools.voice_handler import voice_handler
-from tools.reminder_handler import add_reminder_command, list_reminders, cancel_all_reminders
-import tempfile
+from urllib.parse import urlparse
+with timed("import rag pipeline"):
+    from rag import langchain_pipeline
+    from bot.streaming import MAX_MESSAGE_LENGTH, stream_answer
+with timed("import ocr"):
+    from tools.ocr_reader import extract_text_async, recognize_drug, warm_up_pool as warm_up_ocr
+with timed("import voice"):
+    from tools.voice_handler import voice_handler
+with timed("import reminders"):
+    from tools.reminder_handler import add_reminder_command, list_reminders, cancel_all_reminders, start_reminders
+    from tools.rate_limit import MeteredRequest
+    from bot.update_processor import PerChatUpdateProcessor
+    from tools.admission import admitted
 
 load_dotenv()
 TOKEN = os.getenv('TOKEN')
 BOT_USERNAME: Final = os.getenv('BOT_USERNAME')
 
+# Updates arrive by long polling (default) or by webhook (BOT_MODE=webhook, behind an HTTPS
+# proxy that forwards WEBHOOK_URL to WEBHOOK_LISTEN:WEBHOOK_PORT)
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', 64))   # chats handled at once; one chat stays in order
+POLL_TIMEOUT = 30                                               # long-poll seconds (replies arrive as soon as an update does)
+
+@metrics.timer("bot_update_seconds", type="command")
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "👋 হ্যালো! আমি আপনার bilingual ঔষধ সহায়কারী বট। ইংরেজি বা বাংলা ভাষায় প্রশ্ন করুন, ঔষধের ছবি বা ভয়েস মেসেজ পাঠান।"
     )
 
+@metrics.timer("bot_update_seconds", type="command")
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         """❓ আপনি প্রশ্ন করতে পারেন:
@@ -29,44 +54,49 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 - অথবা ঔষধের ছবি বা ভয়েস মেসেজ দিন।"""
     )
 
-def handle_response(text: str) -> str:
-    try:
-        return answer_query(text)
-    except Exception as e:
-        print("❌ handle_response error:", e)
-        return "⚠️ বুঝতে পারিনি। আবার চেষ্টা করুন।"
+@metrics.timer("bot_update_seconds", type="command")
+async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    state = "✅ ready" if langchain_pipeline.ready() else "⏳ loading models…"
+    await update.message.reply_text(f"🤖 Status: {state}\n\n{startup_report()}")
 
+@metrics.timer("bot_update_seconds", type="text")
+@admitted("text")
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text.strip()
-    response = handle_response(text)
-    await update.message.reply_text(response)
+    # Placeholder goes out immediately and is edited as the answer streams in
+    await stream_answer(update.message, text)
 
+@metrics.timer("bot_update_seconds", type="voice")
+@admitted("voice")
 async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         voice = update.message.voice
         file = await voice.get_file()
 
-        temp_ogg = tempfile.NamedTemporaryFile(delete=False, suffix='.ogg')
-        await file.download_to_drive(temp_ogg.name)
-        temp_ogg.close()
-
-        recognized_text, detected_lang = voice_handler.speech_to_text(temp_ogg.name, return_lang=True)
-        os.unlink(temp_ogg.name)
+        # Decoded and recognized in memory on the STT worker pool
+        data = await file.download_as_bytearray()
+        recognized_text, detected_lang = await voice_handler.speech_to_text(data)
 
         if not recognized_text:
             await update.message.reply_text("❌ দুঃখিত, ভয়েস বুঝা যায়নি।")
             return
 
         await update.message.reply_text(f"🎙️ আপনি বলেছেন: {recognized_text}")
-        answer = handle_response(recognized_text)
-        await update.message.reply_text(f"📝 উত্তর:\n{answer}")
-
-        # Language-specific voice answer
-        tts_path = voice_handler.text_to_speech(answer, language=detected_lang)
-        if tts_path and os.path.exists(tts_path):
-            with open(tts_path, 'rb') as voice_file:
-                await update.message.reply_voice(voice=voice_file)
-            os.unlink(tts_path)
+        answer = await stream_answer(update.message, recognized_text, prefix="📝 উত্তর:\n")
+
+        # Language-specific voice answer (OGG/Opus; cached audio or an already-uploaded file_id)
+        key, audio, file_id = await voice_handler.text_to_speech(answer, language=detected_lang)
+        if file_id:
+            try:
+                await update.message.reply_voice(voice=file_id)
+                return
+            except BadRequest:
+                # file_id no longer valid on Telegram's side → upload the audio again
+                voice_handler.tts.forget_file_id(key)
+                key, audio, _ = await voice_handler.text_to_speech(answer, language=detected_lang)
+        if audio:
+            sent = await update.message.reply_voice(voice=audio)
+            voice_handler.remember_voice(key, sent.voice.file_id)
         else:
             await update.message.reply_text("⚠️ ভয়েসে উত্তর পাঠানো যায়নি।")
 
@@ -74,30 +104,39 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
         print(f"❌ Voice handling error: {e}")
         await update.message.reply_text("⚠️ ভয়েস মেসেজ প্রসেস করতে সমস্যা হয়েছে।")
 
-# OCR Handler (unchanged except minor tweaks)
+# OCR Handler: download to memory, OCR in the process pool, recognise the drug name
+@metrics.timer("bot_update_seconds", type="photo")
+@admitted("photo")
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         photo = update.message.photo[-1]
         file = await photo.get_file()
 
-        file_path = f"temp_{update.message.chat.id}.jpg"
-        await file.download_to_drive(file_path)
-
-        ocr_text = extract_text_from_image(file_path)
-        os.remove(file_path)
+        data = await file.download_as_bytearray()
+        ocr_text = await extract_text_async(data)
 
         if not ocr_text:
             await update.message.reply_text("⚠️ কোন লেখা পড়া যায়নি। অনুগ্রহ করে স্পষ্ট ছবি দিন।")
             return
 
+        name_index = await asyncio.to_thread(langchain_pipeline.get_name_index)
+        hit = recognize_drug(ocr_text, name_index)
+        metrics.counter("ocr_recognized_total").inc(result="drug" if hit else "text_only")
         context.user_data['ocr_text'] = ocr_text
+        context.user_data['drug_key'] = hit.key if hit else None
+        context.user_data['drug_name'] = hit.key.split('|')[0] if hit else None
+
+        if hit:
+            recognized = f"💊 সনাক্ত ঔষধ: {context.user_data['drug_name']}"
+        else:
+            recognized = f"🧾 OCR টেক্সট:\n{ocr_text}"
 
         keyboard = [
             [InlineKeyboardButton("🇧🇩 বাংলা", callback_data='lang_ben')],
             [InlineKeyboardButton("🇬🇧 English", callback_data='lang_eng')],
         ]
         await update.message.reply_text(
-            f"🧾 OCR টেক্সট:\n{ocr_text}\n\n🌐 আপনি কোন ভাষায় তথ্য পেতে চান?",
+            f"{recognized}\n\n🌐 আপনি কোন ভাষায় তথ্য পেতে চান?",
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
@@ -106,6 +145,7 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ ছবি প্রসেস করতে সমস্যা হয়েছে। পরে আবার চেষ্টা করুন।")
 
 # Language & Query Selection (unchanged)
+@metrics.timer("bot_update_seconds", type="language_menu")
 async def handle_language_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -125,11 +165,15 @@ async def handle_language_selection(update: Update, context: ContextTypes.DEFAUL
         reply_markup=InlineKeyboardMarkup(keyboard)
     )
 
+@metrics.timer("bot_update_seconds", type="query_menu")
+@admitted("text")
 async def handle_query_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
     ocr_text = context.user_data.get('ocr_text', '')
+    drug_key = context.user_data.get('drug_key')
+    drug_name = context.user_data.get('drug_name')
     lang = context.user_data.get('lang', 'eng')
 
     if not ocr_text:
@@ -144,26 +188,59 @@ async def handle_query_selection(update: Update, context: ContextTypes.DEFAULT_T
         'pediatric': {'eng': "What is the pediatric usage of this medicine?", 'ben': "শিশুদের ক্ষেত্রে এই ওষুধের ব্যবহার কেমন?"},
     }
 
-    prompt = prompts[query.data.replace('query_', '')][lang]
-    full_query = f"{prompt}\n\n{ocr_text}"
+    intent = query.data.replace('query_', '')
+    prompt = prompts[intent][lang]
 
-    try:
-        response = answer_query(full_query)
-    except Exception as e:
-        print("❌ Error:", e)
-        response = "⚠️ তথ্য আনতে সমস্যা হয়েছে।"
+    # ⚡ Drug recognised in the photo → precomputed answer, no retrieval / LLM
+    facts = await asyncio.to_thread(langchain_pipeline.get_fact_table)
+    text = facts.get(drug_key, intent, 'bn' if lang == 'ben' else 'en') if facts and drug_key else None
+    metrics.counter("menu_answers_total").inc(source="fact_table" if text else "llm")
+    if text:
+        await query.message.reply_text(f"🔍 {prompt}\n\n💊 {drug_name}\n\n{text}"[:MAX_MESSAGE_LENGTH])
+        return
+
+    # LLM fallback gets the clean drug name when we have one, not the whole OCR dump
+    full_query = f"{prompt}\n\n{drug_name or ocr_text}"
 
-    await query.message.reply_text(f"🔍 {prompt}\n\n{response}")
+    await stream_answer(query.message, full_query, prefix=f"🔍 {prompt}\n\n")
 
 async def error(update: Update, context: ContextTypes.DEFAULT_TYPE):
     print(f"⚠️ Error: {context.error}")
 
+# 🔥 Background warm-up: commands and reminders work while the models load
+async def warm_up():
+    try:
+        await asyncio.gather(
+            asyncio.to_thread(langchain_pipeline.warm_up),
+            asyncio.to_thread(voice_handler.warm_up),
+            asyncio.to_thread(warm_up_ocr),
+        )
+        print("✅ Models warmed up")
+    except Exception as e:
+        print(f"⚠️ Warm-up failed (components will load on first use): {e}")
+    print(startup_report())
+
+async def post_init(application):
+    # Reminders stored before the restart are loaded before anything else
+    start_reminders(application)
+    metrics.start()
+    application.create_task(warm_up())
+
 if __name__ == '__main__':
     print("🤖 Bot is starting...")
-    application = ApplicationBuilder().token(TOKEN).build()
+    if BOT_MODE == 'webhook' and not WEBHOOK_URL:
+        raise SystemExit("❌ BOT_MODE=webhook needs WEBHOOK_URL (the public HTTPS URL Telegram should post updates to)")
+    # Every Bot API call is timed by method (tools/rate_limit.MeteredRequest)
+    application = (
+        ApplicationBuilder().token(TOKEN)
+        .request(MeteredRequest(connection_pool_size=256))
+        .concurrent_updates(PerChatUpdateProcessor(CONCURRENT_UPDATES))
+        .post_init(post_init).build()
+    )
 
     application.add_handler(CommandHandler('start', start_command))
     application.add_handler(CommandHandler('help', help_command))
+    application.add_handler(CommandHandler('status', status_command))
     application.add_handler(CommandHandler('remind', add_reminder_command))
     application.add_handler(CommandHandler('list_reminders', list_reminders))
     application.add_handler(CommandHandler('cancel_reminders', cancel_all_reminders))
@@ -177,4 +254,14 @@ if __name__ == '__main__':
     application.add_error_handler(error)
 
     print("✅ Bot is running with full voice + reminder support")
-    application.run_polling(poll_interval=3)
+    if BOT_MODE == 'webhook':
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=urlparse(WEBHOOK_URL).path.lstrip('/'),
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=min(100, CONCURRENT_UPDATES),    # Telegram allows 1-100
+        )
+    else:
+        application.run_polling(poll_interval=0, timeout=POLL_TIMEOUT)
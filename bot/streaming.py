@@ -0,0 +1,95 @@
+# streaming.py
+# Progressive answers: send a placeholder right away, then edit it as sentences stream in.
+# Edits are coalesced so a chat sees at most one edit per EDIT_INTERVAL seconds.
+import time
+import asyncio
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+from rag.async_pipeline import answer_query_stream
+
+EDIT_INTERVAL = 1.0          # Telegram starts flood-limiting around one edit per second per chat
+MAX_MESSAGE_LENGTH = 4096
+PLACEHOLDER = "⏳ ..."
+CURSOR = " ▌"
+
+
+class StreamingReply:
+    def __init__(self, message, prefix: str = "", placeholder: str = PLACEHOLDER):
+        self.message = message
+        self.prefix = prefix
+        self.placeholder = placeholder
+        self.sent = None
+        self.text = ""
+        self.shown = None
+        self.last_edit = 0.0
+        self.flush_task = None
+        self.lock = asyncio.Lock()       # one edit in flight at a time, so they land in order
+
+    async def start(self):
+        self.sent = await self.message.reply_text(self.prefix + self.placeholder)
+        self.shown = self.prefix + self.placeholder
+
+    async def update(self, text: str):
+        self.text = text
+        wait = self.last_edit + EDIT_INTERVAL - time.monotonic()
+        if wait <= 0:
+            await self._edit(self.text.rstrip() + CURSOR)
+        elif self.flush_task is None:
+            # Too soon: one delayed edit will pick up whatever text is newest by then
+            self.flush_task = asyncio.create_task(self._delayed_flush(wait))
+
+    async def finish(self, text: str):
+        if self.flush_task:
+            if self.lock.locked():
+                # The delayed edit is already on its way: let it land before the final one
+                await asyncio.gather(self.flush_task, return_exceptions=True)
+            else:
+                self.flush_task.cancel()
+            self.flush_task = None
+        self.text = text
+        await self._edit(text, final=True)
+
+    async def _delayed_flush(self, wait: float):
+        try:
+            await asyncio.sleep(wait)
+            await self._edit(self.text.rstrip() + CURSOR)
+        except TelegramError as e:
+            print("⚠️ Streaming edit failed:", e)     # best effort; the final edit still follows
+        finally:
+            if self.flush_task is asyncio.current_task():
+                self.flush_task = None
+
+    async def _edit(self, text: str, final: bool = False):
+        body = (self.prefix + text)[:MAX_MESSAGE_LENGTH]
+        async with self.lock:
+            while body != self.shown:
+                self.last_edit = time.monotonic()
+                try:
+                    await self.sent.edit_text(body)
+                    self.shown = body
+                except RetryAfter as e:
+                    if not final:
+                        return    # intermediate edits are simply skipped; the next one carries the newer text
+                    await asyncio.sleep(e.retry_after)
+                except BadRequest as e:
+                    if "not modified" not in str(e).lower():
+                        raise
+                    self.shown = body
+
+
+async def stream_answer(message, query: str, prefix: str = "") -> str:
+    """
+    Streams the pipeline answer into one Telegram message and returns the final text.
+    """
+    reply = StreamingReply(message, prefix)
+    await reply.start()
+    text = ""
+    try:
+        async for chunk in answer_query_stream(query):
+            text += chunk
+            await reply.update(text)
+    except Exception as e:
+        print("❌ stream_answer error:", e)
+        text = text or "⚠️ বুঝতে পারিনি। আবার চেষ্টা করুন।"
+    await reply.finish(text.strip())
+    return text.strip()
@@ -0,0 +1,72 @@
+# update_processor.py
+# Concurrent update handling that keeps each chat in order: updates from different chats run
+# in parallel (up to max_concurrent_updates), updates from the same chat run one at a time in
+# arrival order. Ordering matters here because a photo sets user_data that the following
+# menu taps read.
+import os
+import asyncio
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from tools import metrics
+
+CHAT_BACKLOG = int(os.getenv("CHAT_BACKLOG", 20))     # updates a chat may have queued; more are dropped
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    ApplicationBuilder().concurrent_updates(PerChatUpdateProcessor(64))
+
+    PTB starts one task per update in arrival order. Each waits for its chat's lock first and
+    only then for one of the max_concurrent_updates slots, so a chat with a slow handler and a
+    long backlog holds one slot, not all of them. asyncio locks wake waiters first-in
+    first-out, so a chat's updates are handled in the order they arrived. Updates beyond a
+    chat's backlog cap are dropped; updates without a chat (e.g. polls) run unordered.
+    """
+    def __init__(self, max_concurrent_updates: int, chat_backlog: int = CHAT_BACKLOG):
+        super().__init__(max_concurrent_updates)
+        self.chat_backlog = chat_backlog
+        self.chats = {}           # chat id -> [lock, updates holding or waiting for it]
+
+    @staticmethod
+    def chat_id(update: object):
+        if isinstance(update, Update) and update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+    async def process_update(self, update: object, coroutine):
+        # Replaces the base class' semaphore-then-do_process_update (final only for type
+        # checkers): taking the global slot before the chat lock would let one chat's queued
+        # updates hold every slot while they wait on each other.
+        chat_id = self.chat_id(update)
+        if chat_id is None:
+            async with self._semaphore:
+                await self.do_process_update(update, coroutine)
+            return
+
+        entry = self.chats.get(chat_id)
+        if entry is None:
+            entry = self.chats[chat_id] = [asyncio.Lock(), 0]
+        if entry[1] >= self.chat_backlog:
+            coroutine.close()
+            metrics.counter("updates_dropped_total").inc(reason="chat_backlog")
+            return
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._semaphore:
+                    await self.do_process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.chats[chat_id]
+
+    async def do_process_update(self, update: object, coroutine):
+        await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -1,6 +1,7 @@
 # generate_test_queries.py
 import json
 import random
+from rag.lang_detect import detect_language
 
 # Path to your modified dataset
 DATA_FILE = "data/modified_drug_dataset.json"
@@ -43,23 +44,21 @@ def main():
         if not name or not reference:
             continue
 
-        # English queries
-        for pattern in ENGLISH_PATTERNS:
+        for pattern in ENGLISH_PATTERNS + BANGLA_PATTERNS:
+            query = pattern.format(name=name)
             queries.append({
-                "query": pattern.format(name=name),
-                "reference": reference
+                "query": query,
+                "reference": reference,
+                "lang": detect_language(query)
             })
 
-        # Bangla queries
-        for pattern in BANGLA_PATTERNS:
-            queries.append({
-                "query": pattern.format(name=name),
-                "reference": reference
-            })
-
-    # Shuffle and trim to required size
+    # Shuffle and trim to required size, keeping the English/Bangla split
+    random.shuffle(queries)
+    english_count = int(TOTAL_QUERIES * ENGLISH_RATIO)
+    english = [q for q in queries if q["lang"] == "en"][:english_count]
+    bangla = [q for q in queries if q["lang"] == "bn"][:TOTAL_QUERIES - len(english)]
+    queries = english + bangla
     random.shuffle(queries)
-    queries = queries[:TOTAL_QUERIES]
 
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
         json.dump(queries, f, ensure_ascii=False, indent=2)
@@ -1,32 +1,18 @@
-from langchain_community.vectorstores import Chroma
-from langchain_ollama import OllamaEmbeddings
-
-embedding_model = OllamaEmbeddings(model="mistral")
-
-db = Chroma(
-    persist_directory="embeddings/chroma",
-    embedding_function=embedding_modelfrom langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import SentenceTransformerEmbeddings
 import os
-
-# Load same embedding model you used for building index
-embedding_model = SentenceTransformerEmbeddings(
-    model_name="all-MiniLM-L6-v2"
-)
+import faiss
+from rag.docstore import DOCSTORE_DB, SQLiteDocstore
 
 persist_directory = "embeddings/faiss"
+index_path = os.path.join(persist_directory, "index.faiss")
+db_path = os.path.join(persist_directory, DOCSTORE_DB)
 
-if os.path.exists(persist_directory):
-    db = FAISS.load_local(
-        persist_directory,
-        embedding_model,
-        allow_dangerous_deserialization=True
-    )
-    print(f"📦 Total embedded documents: {len(db.docstore._dict)}")
+# Counts come straight from disk — no embedding model, no pickled docstore
+if os.path.exists(index_path):
+    index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    print(f"🧮 Total vectors: {index.ntotal}")
+    if os.path.exists(db_path):
+        print(f"📦 Total embedded documents: {len(SQLiteDocstore(db_path))}")
+    else:
+        print("⚠️ docstore.sqlite not found. Re-run rag/build_index_chunked.py to export it.")
 else:
     print("❌ FAISS index not found.")
-
-)
-
-collection = db._collection
-print(f"📦 Total embedded documents: {collection.count()}")
@@ -0,0 +1,235 @@
+# answer_cache.py
+# Two-tier answer cache in front of answer_query:
+#   1. exact tier  – LRU + TTL keyed by (language, normalized query)
+#   2. semantic tier – reuses an answer when the English query embedding is close to a cached one
+# Everything is persisted to SQLite so the cache survives restarts.
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from rag.name_index import normalize
+
+CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "cache/answers.sqlite")
+MAX_ENTRIES = 20000
+TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL", 7 * 24 * 3600))
+SEMANTIC_THRESHOLD = 0.95   # cosine similarity needed to reuse an answer
+REPORT_EVERY = 100          # print hit rates every N lookups
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    lang TEXT NOT NULL,
+    query TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created REAL NOT NULL,
+    query_en TEXT,
+    names TEXT,
+    embedding BLOB,
+    PRIMARY KEY (lang, query)
+);
+"""
+
+
+def query_key(query: str) -> str:
+    # Emoji, punctuation or other-script queries normalize to "": keep them apart by their raw text
+    return normalize(query) or query.strip()
+
+
+class AnswerCache:
+    def __init__(self, path: str = CACHE_PATH, embed_fn=None, max_entries: int = MAX_ENTRIES,
+                 ttl: float = TTL_SECONDS, threshold: float = SEMANTIC_THRESHOLD):
+        self.embed_fn = embed_fn
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.db_lock = threading.Lock()  # SQLite writes happen outside self.lock, so lookups never wait on a commit
+        self.entries = OrderedDict()     # (lang, query) -> {"answer", "created", "names", "vector"}
+        self.stats = {"exact": 0, "semantic": 0, "miss": 0}
+        self.semantic = {}               # lang -> SemanticRows, built on first lookup, then kept up to date
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._load()
+
+    def _load(self):
+        cutoff = time.time() - self.ttl
+        with self.conn:
+            self.conn.execute("DELETE FROM answers WHERE created < ?", (cutoff,))
+        rows = self.conn.execute(
+            "SELECT lang, query, answer, created, names, embedding FROM answers ORDER BY created DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        for lang, query, answer, created, names, blob in reversed(rows):
+            vector = np.frombuffer(blob, dtype=np.float32) if blob else None
+            self.entries[(lang, query)] = {
+                "answer": answer, "created": created, "names": names or "", "vector": vector
+            }
+        if rows:
+            print(f"🗃️ Answer cache: loaded {len(rows)} entries")
+
+    def _embed(self, text: str):
+        if self.embed_fn is None:
+            return None
+        vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _count(self, outcome: str):
+        self.stats[outcome] += 1
+        total = sum(self.stats.values())
+        if total % REPORT_EVERY == 0:
+            print(f"📈 Answer cache: {self.report()}")
+
+    def report(self) -> str:
+        total = sum(self.stats.values()) or 1
+        return (f"{len(self.entries)} entries, exact {self.stats['exact'] / total:.1%}, "
+                f"semantic {self.stats['semantic'] / total:.1%}, miss {self.stats['miss'] / total:.1%}")
+
+    def get(self, query: str, lang: str):
+        key = (lang, query_key(query))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and time.time() - entry["created"] <= self.ttl:
+                self.entries.move_to_end(key)
+                self._count("exact")
+                return entry["answer"]
+        return None
+
+    def miss(self):
+        # A lookup that ends without consulting the semantic tier (exact drug-name queries)
+        with self.lock:
+            self._count("miss")
+
+    def get_similar(self, query_en: str, lang: str, names: tuple = (), vector=None):
+        """
+        Semantic lookup on the English query (pass its embedding if already computed).
+        Entries must mention the same drugs, so "Napa" never reuses an answer cached for "Napa Extra".
+        """
+        if vector is None:
+            vector = self._embed(query_en)
+        else:
+            vector = np.asarray(vector, dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+        if vector is None:
+            self._count("miss")
+            return None, None
+
+        names_key = "|".join(sorted(names))
+        with self.lock:
+            key, score = self._semantic_rows(lang).best(vector, names_key)
+            entry = self.entries.get(key) if key else None
+            if entry and score >= self.threshold and time.time() - entry["created"] <= self.ttl:
+                self.entries.move_to_end(key)
+                self._count("semantic")
+                return entry["answer"], vector
+            self._count("miss")
+        return None, vector
+
+    def _semantic_rows(self, lang: str) -> "SemanticRows":
+        if lang not in self.semantic:
+            rows = self.semantic[lang] = SemanticRows()
+            for key, entry in self.entries.items():
+                if key[0] == lang and entry["vector"] is not None:
+                    rows.add(key, entry["names"], entry["vector"])
+        return self.semantic[lang]
+
+    def put(self, query: str, lang: str, answer: str, query_en: str = None, names: tuple = (), vector=None):
+        # Queries naming a drug exactly skip the semantic tier, so their entries need no embedding
+        if vector is None and query_en and not names:
+            vector = self._embed(query_en)
+        key = (lang, query_key(query))
+        entry = {"answer": answer, "created": time.time(), "names": "|".join(sorted(names)), "vector": vector}
+
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            evicted = []
+            while len(self.entries) > self.max_entries:
+                evicted.append(self.entries.popitem(last=False)[0])
+            for old in evicted:
+                if old[0] in self.semantic:
+                    self.semantic[old[0]].remove(old)
+            if lang in self.semantic:
+                if vector is not None:
+                    self.semantic[lang].add(key, entry["names"], vector)
+                else:
+                    self.semantic[lang].remove(key)
+
+        with self.db_lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO answers (lang, query, answer, created, query_en, names, embedding) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (lang, key[1], answer, entry["created"], query_en, entry["names"],
+                     vector.astype(np.float32).tobytes() if vector is not None else None)
+                )
+                self.conn.executemany("DELETE FROM answers WHERE lang = ? AND query = ?", evicted)
+
+
+class SemanticRows:
+    """
+    One language's cached query embeddings as a growable matrix. Writes append a row (or
+    blank out a replaced / evicted one) instead of restacking every vector; dead rows are
+    compacted away once they make up half the matrix.
+    """
+    def __init__(self):
+        self.keys = []
+        self.names = np.empty(0, dtype=object)
+        self.matrix = None
+        self.alive = np.zeros(0, dtype=bool)
+        self.rows = {}            # key -> row
+        self.size = 0
+
+    def add(self, key, names: str, vector):
+        self.remove(key)
+        vector = np.asarray(vector, dtype=np.float32)
+        if self.matrix is None:
+            self.matrix = np.zeros((16, len(vector)), dtype=np.float32)
+            self.names = np.empty(16, dtype=object)
+            self.alive = np.zeros(16, dtype=bool)
+        elif self.size == len(self.matrix):
+            grow = len(self.matrix)
+            self.matrix = np.concatenate([self.matrix, np.zeros_like(self.matrix)])
+            self.names = np.concatenate([self.names, np.empty(grow, dtype=object)])
+            self.alive = np.concatenate([self.alive, np.zeros(grow, dtype=bool)])
+        row = self.size
+        self.matrix[row] = vector
+        self.names[row] = names
+        self.alive[row] = True
+        self.keys.append(key)
+        self.rows[key] = row
+        self.size += 1
+
+    def remove(self, key):
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        self.alive[row] = False
+        if len(self.rows) < self.size // 2:
+            self._compact()
+
+    def _compact(self):
+        live = np.flatnonzero(self.alive[:self.size])
+        self.keys = [self.keys[i] for i in live]
+        self.matrix[:len(live)] = self.matrix[live]
+        self.names[:len(live)] = self.names[live]
+        self.alive[:] = False
+        self.alive[:len(live)] = True
+        self.rows = {key: i for i, key in enumerate(self.keys)}
+        self.size = len(live)
+
+    def best(self, vector, names: str):
+        """
+        Returns (key, cosine score) of the closest live row with the same drug names, or (None, -1).
+        """
+        if not self.rows:
+            return None, -1.0
+        scores = self.matrix[:self.size] @ vector
+        scores[~self.alive[:self.size] | (self.names[:self.size] != names)] = -1.0
+        row = int(np.argmax(scores))
+        return (self.keys[row], float(scores[row])) if scores[row] > -1.0 else (None, -1.0)
@@ -0,0 +1,194 @@
+# async_pipeline.py
+# Non-blocking entry point for the Telegram handlers. Blocking stages run in bounded
+# executors, the Groq call is awaited natively, and every stage has its own concurrency limit.
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from rag import langchain_pipeline as pipeline
+from rag.lang_detect import detect_language
+from rag.translation import split_sentences
+from rag.answer_cache import query_key
+from rag.batching import EmbeddingBatcher, SingleFlight, SingleFlightStream
+from rag.stage_timing import stage
+from tools.startup import is_ready
+
+CPU_WORKERS = int(os.getenv("PIPELINE_CPU_WORKERS", 2))         # embedding + FAISS (release the GIL)
+IO_WORKERS = int(os.getenv("PIPELINE_IO_WORKERS", 16))          # blocking translation HTTP calls
+
+# Max requests inside each stage at once; excess requests wait in line for that stage only
+STAGE_LIMITS = {
+    "translate": IO_WORKERS,
+    "retrieve": CPU_WORKERS,
+    "llm": int(os.getenv("PIPELINE_LLM_CONCURRENCY", 16)),
+}
+
+_cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="pipeline-cpu")
+_io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="pipeline-io")
+_semaphores = {}
+
+
+def _stage(name: str) -> asyncio.Semaphore:
+    # Created lazily so they bind to the running event loop
+    if name not in _semaphores:
+        _semaphores[name] = asyncio.Semaphore(STAGE_LIMITS[name])
+    return _semaphores[name]
+
+
+async def _run(executor, fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+async def translate_async(text: str, source: str, target: str) -> str:
+    async with _stage("translate"):
+        return await _run(_io_executor, pipeline.translate, text, source, target)
+
+
+# 🔀 Identical in-flight queries share one run; query embeddings are micro-batched
+_flights = SingleFlight()
+_stream_flights = SingleFlightStream()
+_batcher = None
+
+
+def _flight_key(query: str) -> tuple:
+    return detect_language(query), query_key(query)
+
+
+async def _retrieve(query_en: str, lang: str):
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbeddingBatcher(pipeline.embed_and_search, _cpu_executor)
+    with stage("retrieve"):
+        async with _stage("retrieve"):
+            hits, names = await _run(_cpu_executor, pipeline.name_hits, query_en)
+        query_vector = dense_ids = None
+        if not names:
+            # Only queries without an exact drug name need the embedding and FAISS
+            query_vector, dense_ids = await _batcher.search(query_en)
+        async with _stage("retrieve"):
+            return await _run(_cpu_executor, pipeline.retrieve_context, query_en, lang, query_vector, dense_ids, hits)
+
+
+async def _cache_answer(answer_cache, *args):
+    # put() commits to SQLite; keep that off the event loop
+    await _run(_io_executor, answer_cache.put, *args)
+
+
+async def answer_query_async(query: str) -> str:
+    return await _flights.do(_flight_key(query), lambda: _answer_query_async(query))
+
+
+async def answer_query_stream(query: str):
+    """
+    Same pipeline as answer_query_async, but yields the answer in sentence-sized chunks
+    as the LLM produces them. Bangla answers are translated sentence by sentence.
+    """
+    async for chunk in _stream_flights.stream(_flight_key(query), lambda: _answer_query_stream(query)):
+        yield chunk
+
+
+async def _answer_query_async(query: str) -> str:
+    with stage("detect"):
+        lang = detect_language(query)
+    if is_ready("answer_cache"):
+        answer_cache = pipeline.get_answer_cache()
+    else:
+        answer_cache = await _run(None, pipeline.get_answer_cache)
+
+    cached = answer_cache.get(query, lang)
+    if cached:
+        return cached
+
+    with stage("translate_in"):
+        # From the detected language: English needs no call, Bangla gets the Bangla glossary
+        query_en = query if lang == "en" else await translate_async(query, lang, 'en')
+
+    if not pipeline.ready():
+        # Still warming up: wait for the models off the event loop
+        await _run(None, pipeline.get_qa_chain)
+    if pipeline.get_qa_chain() is None:
+        return pipeline.NOT_LOADED
+
+    cached, names, query_vector, docs = await _retrieve(query_en, lang)
+    if cached:
+        await _cache_answer(answer_cache, query, lang, cached, query_en, names, query_vector)
+        return cached
+
+    with stage("llm"):
+        async with _stage("llm"):
+            answer_en = await pipeline.agenerate_answer(query_en, docs)
+
+    if not answer_en:
+        return pipeline.NOT_FOUND[lang]
+
+    with stage("translate_out"):
+        answer = await translate_async(answer_en, 'en', 'bn') if lang == "bn" else answer_en
+    await _cache_answer(answer_cache, query, lang, answer, query_en, names, query_vector)
+    return answer
+
+
+async def _complete_sentences(tokens):
+    """
+    Regroups a token stream into whole sentences (each with its trailing separator).
+    """
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        parts = split_sentences(buffer)
+        # parts = [s, sep, s, sep, ..., tail]; everything before the tail is complete
+        if len(parts) > 1:
+            yield "".join(parts[:-1])
+            buffer = parts[-1]
+    if buffer:
+        yield buffer
+
+
+async def _answer_query_stream(query: str):
+    with stage("detect"):
+        lang = detect_language(query)
+    if is_ready("answer_cache"):
+        answer_cache = pipeline.get_answer_cache()
+    else:
+        answer_cache = await _run(None, pipeline.get_answer_cache)
+
+    cached = answer_cache.get(query, lang)
+    if cached:
+        yield cached
+        return
+
+    with stage("translate_in"):
+        query_en = query if lang == "en" else await translate_async(query, lang, 'en')
+
+    if not pipeline.ready():
+        await _run(None, pipeline.get_qa_chain)
+    if pipeline.get_qa_chain() is None:
+        yield pipeline.NOT_LOADED
+        return
+
+    cached, names, query_vector, docs = await _retrieve(query_en, lang)
+    if cached:
+        await _cache_answer(answer_cache, query, lang, cached, query_en, names, query_vector)
+        yield cached
+        return
+
+    chunks = []
+    # Here "llm" spans the whole stream: it includes the per-sentence translate_out time
+    # and whatever the consumer does between chunks
+    with stage("llm"):
+        async with _stage("llm"):
+            async for sentence in _complete_sentences(pipeline.astream_answer(query_en, docs)):
+                if not sentence.strip():
+                    continue
+                if lang == "bn":
+                    # Keep the separator (space / newline) the translator would otherwise drop
+                    stripped = sentence.rstrip()
+                    with stage("translate_out"):
+                        sentence = await translate_async(stripped, 'en', 'bn') + sentence[len(stripped):]
+                chunks.append(sentence)
+                yield sentence
+
+    answer = "".join(chunks).strip()
+    if not answer:
+        yield pipeline.NOT_FOUND[lang]
+        return
+    await _cache_answer(answer_cache, query, lang, answer, query_en, names, query_vector)
@@ -0,0 +1,156 @@
+# batching.py
+# Load-shaping helpers for the async pipeline:
+#   - SingleFlight / SingleFlightStream: identical in-flight queries share one pipeline run
+#   - EmbeddingBatcher: queries arriving within a few ms share one encode + one FAISS search
+import asyncio
+
+import numpy as np
+
+BATCH_WINDOW = 0.005     # seconds to wait for more queries after the first one arrives
+BATCH_MAX_SIZE = 32
+
+
+def _interrupted(e: BaseException) -> Exception:
+    # What waiters see when the shared run died of cancellation (or another BaseException)
+    # rather than an ordinary error: re-raising CancelledError in them would look like they
+    # had been cancelled themselves
+    return e if isinstance(e, Exception) else RuntimeError(f"shared run interrupted ({type(e).__name__})")
+
+
+class SingleFlight:
+    def __init__(self):
+        self.inflight = {}
+        self.shared = 0       # callers that piggybacked on someone else's run
+
+    async def do(self, key, coro_fn):
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn())
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.shared += 1
+        # shield: one caller giving up must not cancel the run for the others
+        return await asyncio.shield(task)
+
+
+class _Flight:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Condition()
+
+    async def publish(self, chunk=None, done=False, error=None):
+        async with self.changed:
+            if chunk is not None:
+                self.chunks.append(chunk)
+            self.done = self.done or done
+            self.error = error or self.error
+            self.changed.notify_all()
+
+    async def subscribe(self):
+        i = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: i < len(self.chunks) or self.done)
+                new, done, error = self.chunks[i:], self.done, self.error
+            for chunk in new:
+                yield chunk
+            i += len(new)
+            if done and i >= len(self.chunks):
+                if error:
+                    raise error
+                return
+
+
+class SingleFlightStream:
+    """
+    Like SingleFlight for async generators: late joiners replay the chunks produced
+    so far and then follow the live stream.
+    """
+    def __init__(self):
+        self.inflight = {}
+        self.shared = 0
+        self.tasks = set()    # pump tasks; the event loop only keeps weak references
+
+    async def _pump(self, key, flight: _Flight, stream):
+        try:
+            async for chunk in stream:
+                await flight.publish(chunk)
+            await flight.publish(done=True)
+        except BaseException as e:
+            # Subscribers wait on the flight, so it must end even if the pump is cancelled
+            await flight.publish(done=True, error=_interrupted(e))
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self.inflight.pop(key, None)
+
+    async def stream(self, key, gen_fn):
+        flight = self.inflight.get(key)
+        if flight is None:
+            flight = self.inflight[key] = _Flight()
+            task = asyncio.ensure_future(self._pump(key, flight, gen_fn()))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        else:
+            self.shared += 1
+        async for chunk in flight.subscribe():
+            yield chunk
+
+
+class EmbeddingBatcher:
+    """
+    search(text) → (vector, dense doc ids). Texts queued within BATCH_WINDOW (or until
+    BATCH_MAX_SIZE) go through a single batch_fn(texts) call on the executor.
+    """
+    def __init__(self, batch_fn, executor, window: float = BATCH_WINDOW, max_size: int = BATCH_MAX_SIZE):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.window = window
+        self.max_size = max_size
+        self.queue = []
+        self.timer = None
+        self.tasks = set()    # running batches; the event loop only keeps weak references
+        self.batches = 0
+        self.queries = 0
+
+    async def search(self, text: str):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queue.append((text, future))
+        if len(self.queue) >= self.max_size:
+            self._flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.queue = self.queue, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, batch: list):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        self.queries += len(batch)
+        try:
+            vectors, dense_ids = await asyncio.get_running_loop().run_in_executor(self.executor, self.batch_fn, texts)
+        except BaseException as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(_interrupted(e))
+            if not isinstance(e, Exception):
+                raise
+            return
+        position = {text: i for i, text in enumerate(texts)}
+        for text, future in batch:
+            if not future.done():
+                i = position[text]
+                future.set_result((np.asarray(vectors[i]), dense_ids[i]))
@@ -1,70 +1,363 @@
 # build_index_chunked.py
 import os
 import json
+import shutil
+import hashlib
+import argparse
+from multiprocessing import Pool
 from tqdm import tqdm
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import SentenceTransformerEmbeddings
 from langchain.schema import Document
+from rag.faiss_index import INDEX_TYPES, convert_index, recall_report
+from rag.docstore import DOCSTORE_DB, export_docstore
+from rag.embeddings import get_embeddings
+from rag.sections import OVERVIEW, SECTION_TITLES, split_entry
 
 # Config
 json_file = "data/modified_drug_dataset.json"
 persist_directory = "embeddings/faiss"
-CHUNK_SIZE = 50
-
-# Embedding model (SentenceTransformer)
-embedding_model = SentenceTransformerEmbeddings(
-    model_name="all-MiniLM-L6-v2",  # চাইলে অন্য মডেল দিতে পারেন
-    model_kwargs={"device": "cuda" if os.environ.get("CUDA_VISIBLE_DEVICES") else "cpu"}
-)
-
-# Load JSON
-print("📄 Loading JSON file...")
-with open(json_file, "r", encoding="utf-8") as f:
-    data = json.load(f)
-
-# Prepare all documents
-all_docs = []
-for entry in data:
+shard_directory = "embeddings/shards"
+CHECKPOINT_EVERY = 5000   # docs embedded between index saves in sync mode
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 2       # 2: one document per section (was one "full" document per drug)
+
+# Parallel build config
+SHARD_SIZE = 2000          # docs per shard (one checkpoint per shard)
+ENCODE_BATCH_SIZE = 256    # SentenceTransformer encode batch size
+NUM_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+
+
+def load_embedding_model(batch_size: int = 32, threads: int = 0):
+    # Embedding model (EMBEDDING_BACKEND=torch|onnx, see rag/embeddings.py); no query cache at build time
+    return get_embeddings(cache=False, batch_size=batch_size, threads=threads)
+
+
+def drug_key(entry: dict) -> str:
+    # Stable identity of a drug entry: brand Name + Generic Name
+    name = (entry.get("Name") or "Unknown").strip()
+    generic_name = (entry.get("Generic Name") or "").strip()
+    return f"{name}|{generic_name}"
+
+
+def documents_hash(docs: list) -> str:
+    # Hash of what actually gets embedded, so a change to the sectioning rules re-embeds
+    # the affected drugs just like an edit to the dataset does
+    payload = [(i, doc.page_content, doc.metadata) for i, doc in docs]
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def doc_id(key: str, section: str) -> str:
+    return f"{key}::{section}"
+
+
+def entry_to_documents(entry: dict, key: str) -> list:
     name = entry.get("Name", "Unknown")
     entry_type = entry.get("Type", "")
     generic_name = entry.get("Generic Name", "")
 
-    # Include all non-empty fields
-    content_parts = []
-    for key, value in entry.items():
-        if value and isinstance(value, str):
-            content_parts.append(f"{key}: {value}")
+    # One document per section (overview, indications, side effects, dosage, ...);
+    # each starts with the drug name so it still makes sense on its own in a prompt
+    title = f"{name} ({generic_name})" if generic_name else name
+    docs = []
+    for section, fields in split_entry(entry).items():
+        lines = [f"{field}: {value}" for field, value in fields]
+        if section != OVERVIEW:
+            lines.insert(0, f"{title} — {SECTION_TITLES[section]}")
+        metadata = {"name": name, "type": entry_type, "generic": generic_name, "key": key, "section": section}
+        docs.append((doc_id(key, section), Document(page_content="\n".join(lines), metadata=metadata)))
+    return docs
+
+
+def load_entries(path: str) -> dict:
+    """
+    Returns {drug key: dataset entry} in dataset order (shared by the index and rag/fact_table.py).
+    """
+    # Load JSON
+    print("📄 Loading JSON file...")
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    entries = {}
+    for entry in data:
+        key = drug_key(entry)
+        # Same Name + Generic Name twice (e.g. different strengths) → disambiguate by position
+        base_key, n = key, 2
+        while key in entries:
+            key = f"{base_key}#{n}"
+            n += 1
+        entries[key] = entry
+    return entries
+
+
+def load_documents(path: str) -> dict:
+    """
+    Returns {drug key: {"hash", "name", "generic", "docs": [(doc_id, Document), ...]}} in dataset order.
+    """
+    drugs = {}
+    for key, entry in load_entries(path).items():
+        docs = entry_to_documents(entry, key)
+        drugs[key] = {
+            "hash": documents_hash(docs),
+            "name": entry.get("Name", ""),
+            "generic": entry.get("Generic Name", ""),
+            "docs": docs,
+        }
+
+    print(f"📦 Total drugs: {len(drugs)}, docs: {sum(len(d['docs']) for d in drugs.values())}")
+    return drugs
+
+
+# 📒 Manifest: per-drug content hash + the vector ids stored for it
+def manifest_path(directory: str = persist_directory) -> str:
+    return os.path.join(directory, MANIFEST_FILE)
+
+
+def _read_manifest(directory: str):
+    path = manifest_path(directory)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_manifest(directory: str = persist_directory):
+    manifest = _read_manifest(directory)
+    return manifest["drugs"] if manifest else None
+
+
+def manifest_version(directory: str = persist_directory):
+    manifest = _read_manifest(directory)
+    return manifest.get("version") if manifest else None
+
+
+def manifest_entry(drug: dict) -> dict:
+    return {
+        "hash": drug["hash"],
+        "name": drug["name"],
+        "generic": drug["generic"],
+        "ids": [i for i, _ in drug["docs"]],
+    }
+
+
+def save_index(db, manifest: dict, directory: str = persist_directory):
+    # Index and manifest are always written together so they never disagree;
+    # the SQLite docstore is exported once at the end, so drop the now-stale copy
+    db.save_local(directory)
+    stale_db = os.path.join(directory, DOCSTORE_DB)
+    if os.path.exists(stale_db):
+        os.remove(stale_db)
+    tmp = manifest_path(directory) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "drugs": manifest}, f, ensure_ascii=False)
+    os.replace(tmp, manifest_path(directory))
+
 
-    full_text = "\n".join(content_parts)
-    all_docs.append(Document(page_content=full_text, metadata={"name": name, "type": entry_type}))
+def diff_manifest(drugs: dict, manifest: dict) -> dict:
+    added = [k for k in drugs if k not in manifest]
+    changed = [k for k in drugs if k in manifest and manifest[k]["hash"] != drugs[k]["hash"]]
+    removed = [k for k in manifest if k not in drugs]
+    unchanged = len(drugs) - len(added) - len(changed)
+    return {"added": added, "changed": changed, "removed": removed, "unchanged": unchanged}
 
-print(f"📦 Total docs to embed: {len(all_docs)}")
 
-# Load existing FAISS index or create new
-if os.path.exists(persist_directory):
-    print("🔄 Loading existing FAISS index...")
-    db = FAISS.load_local(
-        persist_directory,
-        embedding_model,
-        allow_dangerous_deserialization=True
+def print_diff(diff: dict, limit: int = 10):
+    print(f"📊 Sync diff: +{len(diff['added'])} added, ~{len(diff['changed'])} changed, "
+          f"-{len(diff['removed'])} removed, ={diff['unchanged']} unchanged")
+    for label in ("added", "changed", "removed"):
+        keys = diff[label]
+        if keys:
+            more = f" … (+{len(keys) - limit} more)" if len(keys) > limit else ""
+            print(f"   {label}: {', '.join(keys[:limit])}{more}")
+
+
+# 🔄 Incremental sync mode (default)
+def sync_index(drugs: dict) -> dict:
+    embedding_model = load_embedding_model()
+
+    manifest = None
+    db = None
+    if os.path.exists(persist_directory):
+        manifest = load_manifest()
+        if manifest is None:
+            # Legacy index built by count-offset resume: vector ids are unknown, so it can't be patched
+            print("⚠️ Existing index has no manifest — rebuilding from scratch.")
+        elif manifest_version() != MANIFEST_VERSION:
+            # Document layout changed (e.g. per-drug → per-section docs): every id differs
+            print("⚠️ Existing index uses an older document layout — rebuilding from scratch.")
+            manifest = None
+        else:
+            print("🔄 Loading existing FAISS index...")
+            db = FAISS.load_local(
+                persist_directory,
+                embedding_model,
+                allow_dangerous_deserialization=True
+            )
+    if manifest is None or db is None:
+        print("🆕 Creating new FAISS index...")
+        manifest, db = {}, None
+
+    diff = diff_manifest(drugs, manifest)
+    print_diff(diff)
+
+    # Remove vectors of edited and deleted drugs
+    stale_ids = [i for k in diff["changed"] + diff["removed"] for i in manifest[k]["ids"]]
+    if stale_ids:
+        print(f"🗑️ Deleting {len(stale_ids)} stale vectors")
+        db.delete(stale_ids)
+        for k in diff["changed"] + diff["removed"]:
+            del manifest[k]
+        save_index(db, manifest)
+
+    # Embed new and edited drugs; checkpoint every CHECKPOINT_EVERY docs
+    todo = diff["added"] + diff["changed"]
+    pending_keys, pending_docs = [], []
+
+    def flush():
+        nonlocal db
+        if not pending_docs:
+            return
+        ids = [i for i, _ in pending_docs]
+        docs = [d for _, d in pending_docs]
+        if db is None:
+            db = FAISS.from_documents(docs, embedding_model, ids=ids)
+        else:
+            db.add_documents(docs, ids=ids)
+        for k in pending_keys:
+            manifest[k] = manifest_entry(drugs[k])
+        save_index(db, manifest)
+        print(f"✅ Saved progress: {len(manifest)} drugs indexed")
+        pending_keys.clear()
+        pending_docs.clear()
+
+    for k in tqdm(todo):
+        pending_keys.append(k)
+        pending_docs.extend(drugs[k]["docs"])
+        if len(pending_docs) >= CHECKPOINT_EVERY:
+            flush()
+    flush()
+
+    if not todo and not stale_ids:
+        print("✨ Index already up to date")
+    if db is not None and (todo or stale_ids or not os.path.exists(os.path.join(persist_directory, DOCSTORE_DB))):
+        export_docstore(db, persist_directory)
+    return diff
+
+
+# ⚡ Parallel sharded mode
+_worker_model = None
+
+
+def _init_worker(batch_size: int, threads: int):
+    # Each worker owns one model copy; split CPU threads so workers don't oversubscribe cores
+    global _worker_model
+    _worker_model = load_embedding_model(batch_size, threads)
+
+
+def shard_name(index: int, docs: list) -> str:
+    # Shard name carries a content fingerprint, so a changed dataset never reuses a stale shard
+    digest = hashlib.sha1()
+    for doc_id_, doc in docs:
+        digest.update(doc_id_.encode("utf-8"))
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(json.dumps(doc.metadata, sort_keys=True).encode("utf-8"))
+    return f"shard_{index:05d}_{digest.hexdigest()[:12]}"
+
+
+def _embed_shard(job) -> str:
+    name, docs = job
+    texts = [doc.page_content for _, doc in docs]
+    vectors = _worker_model.embed_documents(texts)
+
+    shard_db = FAISS.from_embeddings(
+        list(zip(texts, vectors)),
+        _worker_model,
+        metadatas=[doc.metadata for _, doc in docs],
+        ids=[i for i, _ in docs]
     )
-    existing_count = len(db.index_to_docstore_id)
-else:
-    print("🆕 Creating new FAISS index...")
+
+    # Write to a temp dir and rename, so a killed worker never leaves a half-written shard
+    final_path = os.path.join(shard_directory, name)
+    tmp_path = final_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    shard_db.save_local(tmp_path)
+    os.replace(tmp_path, final_path)
+    return name
+
+
+def build_parallel(drugs: dict, workers: int = NUM_WORKERS, batch_size: int = ENCODE_BATCH_SIZE,
+                   shard_size: int = SHARD_SIZE):
+    os.makedirs(shard_directory, exist_ok=True)
+
+    all_docs = [d for drug in drugs.values() for d in drug["docs"]]
+    jobs = []
+    for shard_index, i in enumerate(range(0, len(all_docs), shard_size)):
+        docs = all_docs[i:i+shard_size]
+        jobs.append((shard_name(shard_index, docs), docs))
+
+    # Checkpoint = finished shard directories; only missing shards get embedded
+    done = set(os.listdir(shard_directory))
+    pending = [job for job in jobs if job[0] not in done]
+    print(f"📍 Shards: {len(jobs)} total, {len(jobs) - len(pending)} already embedded")
+
+    if pending:
+        workers = max(1, min(workers, len(pending)))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        print(f"⚡ Embedding {len(pending)} shards on {workers} workers (batch={batch_size}, threads={threads})")
+        with Pool(workers, initializer=_init_worker, initargs=(batch_size, threads)) as pool:
+            for _ in tqdm(pool.imap_unordered(_embed_shard, pending), total=len(pending)):
+                pass
+
+    # Merge all shards once and write the final index a single time
+    print("🔗 Merging shards...")
+    embedding_model = load_embedding_model()
     db = None
-    existing_count = 0
+    for name, _ in tqdm(jobs):
+        shard_db = FAISS.load_local(
+            os.path.join(shard_directory, name),
+            embedding_model,
+            allow_dangerous_deserialization=True
+        )
+        if db is None:
+            db = shard_db
+        else:
+            db.merge_from(shard_db)
+
+    if db is not None:
+        save_index(db, {k: manifest_entry(drug) for k, drug in drugs.items()})
+        export_docstore(db, persist_directory)
+        print(f"✅ Saved merged index with {len(db.index_to_docstore_id)} docs")
 
-print(f"📍 Already embedded: {existing_count} documents")
+    # Drop shards from older dataset versions
+    keep = {name for name, _ in jobs}
+    for name in os.listdir(shard_directory):
+        if name not in keep:
+            shutil.rmtree(os.path.join(shard_directory, name), ignore_errors=True)
 
-# Embed remaining chunks
-for i in range(existing_count, len(all_docs), CHUNK_SIZE):
-    chunk = all_docs[i:i+CHUNK_SIZE]
-    print(f"🧩 Embedding docs {i} → {i+len(chunk)}")
-    if db is None:
-        db = FAISS.from_documents(chunk, embedding_model)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the FAISS index for the drug dataset")
+    parser.add_argument("--parallel", action="store_true",
+                        help="full rebuild: embed shards on a worker pool and merge once")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=ENCODE_BATCH_SIZE)
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--index-type", nargs="+", choices=INDEX_TYPES, default=["flat"],
+                        help="also build approximate indexes from the flat one")
+    parser.add_argument("--report", action="store_true", help="print recall-vs-latency against flat")
+    args = parser.parse_args()
+
+    drugs = load_documents(json_file)
+    if args.parallel:
+        build_parallel(drugs, args.workers, args.batch_size, args.shard_size)
     else:
-        db.add_documents(chunk)
-    db.save_local(persist_directory)
-    print(f"✅ Saved progress at {i+len(chunk)} docs")
+        # Default: content-hash sync — only new/edited/removed drugs touch the index
+        sync_index(drugs)
+
+    for index_type in args.index_type:
+        if index_type != "flat":
+            convert_index(persist_directory, index_type)
+    if args.report:
+        recall_report(persist_directory, load_embedding_model())
 
-print("🎉 Embedding completed successfully!")
+    print("🎉 Embedding completed successfully!")
@@ -0,0 +1,151 @@
+# docstore.py
+# SQLite-backed docstore keyed by vector id: retrieval fetches only the k documents it needs,
+# and loading it needs no pickle deserialization.
+import os
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+
+from langchain.schema import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+from rag.name_index import STOPWORDS, tokenize
+
+DOCSTORE_DB = "docstore.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT UNIQUE NOT NULL,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vectors (
+    pos INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(content, content='docs', content_rowid='rowid');
+"""
+
+
+class _Connections:
+    # sqlite3 connections can't be shared across threads; keep one per thread
+    def __init__(self, path: str, read_only: bool):
+        self.path = path
+        self.read_only = read_only
+        self.local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            if self.read_only:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.executescript(SCHEMA)
+            self.local.conn = conn
+        return conn
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    def __init__(self, path: str, read_only: bool = True):
+        self.connections = _Connections(path, read_only)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self.connections.get()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def search(self, search: str):
+        row = self.conn.execute("SELECT content, metadata FROM docs WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def mget(self, ids: list) -> dict:
+        if not ids:
+            return {}
+        marks = ",".join("?" * len(ids))
+        rows = self.conn.execute(f"SELECT id, content, metadata FROM docs WHERE id IN ({marks})", list(ids))
+        return {i: Document(page_content=c, metadata=json.loads(m)) for i, c, m in rows}
+
+    def add(self, texts: dict) -> None:
+        with self.conn:
+            for doc_id, doc in texts.items():
+                cur = self.conn.execute(
+                    "INSERT INTO docs (id, content, metadata) VALUES (?, ?, ?)",
+                    (doc_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False))
+                )
+                self.conn.execute("INSERT INTO docs_fts (rowid, content) VALUES (?, ?)",
+                                  (cur.lastrowid, doc.page_content))
+
+    def delete(self, ids: list) -> None:
+        with self.conn:
+            for doc_id in ids:
+                row = self.conn.execute("SELECT rowid, content FROM docs WHERE id = ?", (doc_id,)).fetchone()
+                if row is None:
+                    continue
+                self.conn.execute("INSERT INTO docs_fts (docs_fts, rowid, content) VALUES ('delete', ?, ?)", row)
+                self.conn.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+
+    def lexical_search(self, query: str, k: int = 20) -> list:
+        """
+        BM25 ranking through SQLite FTS5 → [doc_id] best first.
+        """
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t not in STOPWORDS]
+        if not terms:
+            return []
+        match = " OR ".join(f'"{t}"' for t in terms)
+        rows = self.conn.execute(
+            "SELECT docs.id FROM docs_fts JOIN docs ON docs.rowid = docs_fts.rowid "
+            "WHERE docs_fts MATCH ? ORDER BY bm25(docs_fts) LIMIT ?",
+            (match, k)
+        )
+        return [r[0] for r in rows]
+
+
+class SQLiteIdMap(Mapping):
+    """
+    FAISS position → docstore id, read from the same database instead of the pickle.
+    """
+    def __init__(self, docstore: SQLiteDocstore):
+        self.docstore = docstore
+
+    def __getitem__(self, pos):
+        row = self.docstore.conn.execute("SELECT doc_id FROM vectors WHERE pos = ?", (int(pos),)).fetchone()
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def __len__(self):
+        return self.docstore.conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def __iter__(self):
+        for (pos,) in self.docstore.conn.execute("SELECT pos FROM vectors ORDER BY pos"):
+            yield pos
+
+
+def export_docstore(db, directory: str) -> str:
+    """
+    Writes the FAISS store's docstore + id mapping into directory/docstore.sqlite.
+    """
+    path = os.path.join(directory, DOCSTORE_DB)
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    store = SQLiteDocstore(tmp, read_only=False)
+    docs = db.docstore._dict
+    store.add({doc_id: docs[doc_id] for doc_id in db.index_to_docstore_id.values()})
+    with store.conn:
+        store.conn.executemany("INSERT INTO vectors (pos, doc_id) VALUES (?, ?)", db.index_to_docstore_id.items())
+    store.conn.execute("INSERT INTO docs_fts (docs_fts) VALUES ('optimize')")
+    store.conn.commit()
+    store.conn.close()
+
+    os.replace(tmp, path)
+    print(f"💾 Exported {len(docs)} docs to {path}")
+    return path
@@ -0,0 +1,204 @@
+# embeddings.py
+# Pluggable embedding backends for all-MiniLM-L6-v2:
+#   torch – SentenceTransformer (default, same as before)
+#   onnx  – exported + int8-quantized ONNX model on onnxruntime (CPU), no PyTorch at runtime
+# plus an LRU cache of query embeddings.
+#
+#   python -m rag.embeddings export   # writes embeddings/onnx/model_quantized.onnx + tokenizer
+#   python -m rag.embeddings verify   # compares onnx vs torch vectors and retrieval results
+import os
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+HF_MODEL_ID = f"sentence-transformers/{MODEL_NAME}"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+DEVICE = "cuda" if os.environ.get("CUDA_VISIBLE_DEVICES") else "cpu"
+ONNX_DIR = "embeddings/onnx"
+ONNX_MODEL = "model_quantized.onnx"
+MAX_LENGTH = 256           # all-MiniLM-L6-v2's max_seq_length
+QUERY_CACHE_SIZE = 4096
+QUERY_FILE = "Data/test_queries.json"
+
+# verify() tolerances
+MIN_COSINE = 0.98
+MIN_TOPK_OVERLAP = 0.9
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Same pipeline as the SentenceTransformer model (BERT → mean pooling → L2 normalize),
+    run with onnxruntime.
+    """
+    def __init__(self, model_dir: str = ONNX_DIR, batch_size: int = 32, threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads  # 0 = onnxruntime default
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, ONNX_MODEL), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(MAX_LENGTH)
+        self.tokenizer.enable_padding()
+        self.batch_size = batch_size
+
+    def _encode(self, texts: list) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {"input_ids": input_ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feed)[0]                      # (batch, tokens, 384)
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: list) -> list:
+        vectors = [self._encode(texts[i:i+self.batch_size]) for i in range(0, len(texts), self.batch_size)]
+        return np.vstack(vectors).tolist() if vectors else []
+
+    def embed_query(self, text: str) -> list:
+        return self.embed_documents([text])[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LRU cache in front of any backend. Used at query time, where popular questions repeat.
+    """
+    def __init__(self, base: Embeddings, size: int = QUERY_CACHE_SIZE):
+        self.base = base
+        self.size = size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _get(self, text: str):
+        with self.lock:
+            vector = self.cache.get(text)
+            if vector is not None:
+                self.cache.move_to_end(text)
+                self.hits += 1
+            return vector
+
+    def _put(self, text: str, vector: list):
+        with self.lock:
+            self.misses += 1
+            self.cache[text] = vector
+            while len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+
+    def embed_documents(self, texts: list) -> list:
+        found = {t: self._get(t) for t in texts}
+        missing = list(dict.fromkeys(t for t, v in found.items() if v is None))
+        if missing:
+            for text, vector in zip(missing, self.base.embed_documents(missing)):
+                self._put(text, vector)
+                found[text] = vector
+        return [found[t] for t in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self.embed_documents([text])[0]
+
+
+def get_embeddings(backend: str = EMBEDDING_BACKEND, cache: bool = True, batch_size: int = 32,
+                   threads: int = 0) -> Embeddings:
+    # threads: intra-op CPU threads (0 = library default)
+    if backend == "onnx":
+        model = OnnxEmbeddings(batch_size=batch_size, threads=threads)
+    elif backend == "torch":
+        from langchain_community.embeddings import SentenceTransformerEmbeddings
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        model = SentenceTransformerEmbeddings(
+            model_name=MODEL_NAME,
+            model_kwargs={"device": DEVICE},
+            encode_kwargs={"batch_size": batch_size}
+        )
+    else:
+        raise ValueError(f"Unknown embedding backend: {backend} (torch / onnx)")
+    return CachedEmbeddings(model) if cache else model
+
+
+# 📦 Export: PyTorch → ONNX → dynamic int8 quantization
+def export_onnx(out_dir: str = ONNX_DIR):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(HF_MODEL_ID)
+    model = AutoModel.from_pretrained(HF_MODEL_ID).eval()
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    fp32_path = os.path.join(out_dir, "model.onnx")
+
+    print("📦 Exporting ONNX model...")
+    axes = {0: "batch", 1: "tokens"}
+    torch.onnx.export(
+        model,
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        fp32_path,
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={"input_ids": axes, "attention_mask": axes, "token_type_ids": axes, "last_hidden_state": axes},
+        opset_version=14,
+    )
+    print("🗜️ Quantizing to int8...")
+    quantize_dynamic(fp32_path, os.path.join(out_dir, ONNX_MODEL), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(out_dir)
+    for name in ("model.onnx", ONNX_MODEL):
+        print(f"   {name}: {os.path.getsize(os.path.join(out_dir, name)) / 2**20:.1f} MB")
+
+
+# ✅ Verify: onnx must match torch within tolerance, on vectors and on retrieval
+def _timed_embed(model, queries: list):
+    start = time.perf_counter()
+    vectors = np.array([model.embed_query(q) for q in queries], dtype=np.float32)
+    return vectors, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def verify(limit: int = 300, k: int = 10) -> bool:
+    from rag.faiss_index import read_index
+
+    with open(QUERY_FILE, "r", encoding="utf-8") as f:
+        queries = [item["query"] for item in json.load(f)][:limit]
+
+    torch_vectors, torch_ms = _timed_embed(get_embeddings("torch", cache=False), queries)
+    onnx_vectors, onnx_ms = _timed_embed(get_embeddings("onnx", cache=False), queries)
+    cosine = np.sum(torch_vectors * onnx_vectors, axis=1) / (
+        np.linalg.norm(torch_vectors, axis=1) * np.linalg.norm(onnx_vectors, axis=1))
+
+    index = read_index("embeddings/faiss")
+    _, torch_ids = index.search(torch_vectors, k)
+    _, onnx_ids = index.search(onnx_vectors, k)
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(torch_ids, onnx_ids)])
+    top1 = np.mean(torch_ids[:, 0] == onnx_ids[:, 0])
+
+    print(f"📊 {len(queries)} queries")
+    print(f"   cosine(torch, onnx): mean {cosine.mean():.4f}, min {cosine.min():.4f}")
+    print(f"   top-{k} overlap {overlap:.3f}, top-1 agreement {top1:.3f}")
+    print(f"   latency per query: torch {torch_ms:.1f} ms, onnx {onnx_ms:.1f} ms ({torch_ms / onnx_ms:.1f}x)")
+    ok = cosine.min() >= MIN_COSINE and overlap >= MIN_TOPK_OVERLAP
+    print("✅ within tolerance" if ok else "❌ outside tolerance")
+    return ok
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    if command == "export":
+        export_onnx()
+    elif command == "verify":
+        sys.exit(0 if verify() else 1)
+    else:
+        print("usage: python -m rag.embeddings [export|verify]")
@@ -0,0 +1,144 @@
+# fact_table.py
+# Precomputed answers for the OCR category menu: drug × intent × language → text,
+# built from the dataset fields (Bangla translated ahead of time) and stored in SQLite.
+# A menu tap on a drug recognised in the photo (tools/ocr_reader.py recognize_drug)
+# is a single row lookup — no retrieval, no LLM.
+#
+#   python -m rag.fact_table                 # build / update (only changed rows are re-translated)
+#   python -m rag.fact_table --no-translate  # English only
+import os
+import hashlib
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tqdm import tqdm
+
+from rag.sections import MENU_SECTIONS, split_entry, truncate
+
+FACTS_DB = os.getenv("FACT_TABLE_PATH", "embeddings/facts.sqlite")
+MAX_FACT_CHARS = 1500        # per answer; keeps Bangla translations well under Telegram's 4096
+TRANSLATE_WORKERS = 8
+COMMIT_EVERY = 200
+
+SCHEMA = """
+DROP TABLE IF EXISTS drugs;      -- drug identification moved to recognize_drug + the name index
+CREATE TABLE IF NOT EXISTS facts (
+    key TEXT NOT NULL,
+    intent TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    text TEXT NOT NULL,
+    source_hash TEXT NOT NULL,    -- hash of the English text this row was made from
+    PRIMARY KEY (key, intent, lang)
+);
+"""
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def entry_facts(entry: dict) -> dict:
+    """
+    {intent: English text} for every menu intent the entry has data for.
+    """
+    sections = split_entry(entry)
+    facts = {}
+    for intent, wanted in MENU_SECTIONS.items():
+        parts = [f"{field}: {value}" for section in wanted for field, value in sections.get(section, [])
+                 if field not in ("Name", "Generic Name")]
+        if parts:
+            facts[intent] = truncate("\n\n".join(parts), MAX_FACT_CHARS)
+    return facts
+
+
+# 🏗️ Build
+def build_fact_table(json_path: str, path: str = FACTS_DB, translate: bool = True,
+                     workers: int = TRANSLATE_WORKERS):
+    from rag.build_index_chunked import load_entries
+
+    entries = load_entries(json_path)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.executescript(SCHEMA)
+
+    english = {}
+    for key, entry in entries.items():
+        for intent, text in entry_facts(entry).items():
+            english[(key, intent)] = text
+
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO facts VALUES (?, ?, 'en', ?, ?)",
+                         [(k, i, text, _hash(text)) for (k, i), text in english.items()])
+        # Drop rows for drugs / intents that no longer exist
+        stale = [row for row in conn.execute("SELECT key, intent FROM facts") if tuple(row) not in english]
+        conn.executemany("DELETE FROM facts WHERE key = ? AND intent = ?", stale)
+    print(f"📦 {len(entries)} drugs, {len(english)} English facts")
+
+    if not translate:
+        return
+
+    # Only rows whose English source changed (or that were never translated) go to the translator
+    done = {(k, i): h for k, i, h in conn.execute("SELECT key, intent, source_hash FROM facts WHERE lang = 'bn'")}
+    todo = [(k, i) for (k, i), text in english.items() if done.get((k, i)) != _hash(text)]
+    print(f"🌐 Translating {len(todo)} facts to Bangla ({len(english) - len(todo)} up to date)")
+    if not todo:
+        return
+
+    from rag.translation import get_translator
+    translator = get_translator()
+    pending, failed = [], 0
+
+    def work(item):
+        text = english[item]
+        return item, text, translator.translate(text, "en", "bn")
+
+    # Concurrent calls are coalesced into batched backend requests by the Translator
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (key, intent), text, translated in tqdm(pool.map(work, todo), total=len(todo)):
+            if translated == text:
+                failed += 1       # the translator returns its input on failure; retried next run
+                continue
+            pending.append((key, intent, translated, _hash(text)))
+            if len(pending) >= COMMIT_EVERY:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO facts VALUES (?, ?, 'bn', ?, ?)", pending)
+                pending.clear()
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO facts VALUES (?, ?, 'bn', ?, ?)", pending)
+    if failed:
+        print(f"⚠️ {failed} facts could not be translated; run again to retry")
+
+
+# 🔎 Lookup
+class FactTable:
+    def __init__(self, path: str = FACTS_DB):
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def get(self, key: str, intent: str, lang: str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT text FROM facts WHERE key = ? AND intent = ? AND lang = ?", (key, intent, lang)
+            ).fetchone()
+        return row[0] if row else None
+
+
+def load_fact_table(path: str = FACTS_DB):
+    if not os.path.exists(path):
+        print(f"⚠️ Fact table not found at {path} — menu answers will use the LLM.")
+        return None
+    return FactTable(path)
+
+
+if __name__ == "__main__":
+    from rag.build_index_chunked import json_file
+
+    parser = argparse.ArgumentParser(description="Build the precomputed menu fact table")
+    parser.add_argument("--no-translate", action="store_true", help="skip the Bangla translations")
+    parser.add_argument("--workers", type=int, default=TRANSLATE_WORKERS)
+    args = parser.parse_args()
+    build_fact_table(json_file, translate=not args.no_translate, workers=args.workers)
+    print("🎉 Fact table ready")
@@ -0,0 +1,187 @@
+# faiss_index.py
+# Approximate FAISS index types (HNSW / IVF-PQ / SQ8), memory-mapped loading and recall-vs-latency report
+import os
+import json
+import time
+import pickle
+import shutil
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from rag.docstore import DOCSTORE_DB, SQLiteDocstore, SQLiteIdMap
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq", "sq8")
+
+# Build / search parameters
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 16
+PQ_SUBVECTOR_DIM = 8     # 384-dim MiniLM → 48 sub-quantizers
+PQ_TRAIN_POINTS = 39     # faiss wants ≥ 39 training points per centroid
+PQ_MIN_BITS = 4          # smallest codebook (16 centroids per sub-quantizer) worth building
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+QUERY_FILE = "Data/test_queries.json"
+
+
+def index_directory(persist_directory: str, index_type: str) -> str:
+    # flat lives in the base directory; the others sit next to it (embeddings/faiss_hnsw, ...)
+    return persist_directory if index_type == "flat" else f"{persist_directory}_{index_type}"
+
+
+def _ivfpq(vectors: np.ndarray):
+    n, d = vectors.shape
+    if n < PQ_TRAIN_POINTS * 2 ** PQ_MIN_BITS:
+        # The sample dataset or an early sync checkpoint: too few vectors to train even the
+        # smallest codebook, and a flat search over this many is fast anyway
+        print(f"⚠️ {n} vectors are too few to train IVF-PQ (need {PQ_TRAIN_POINTS * 2 ** PQ_MIN_BITS}), "
+              f"building a flat index instead")
+        return faiss.IndexFlatL2(d)
+    nlist = int(max(1, min(4 * np.sqrt(n), n // PQ_TRAIN_POINTS)))
+    m = max(1, d // PQ_SUBVECTOR_DIM)
+    while d % m:
+        m -= 1
+    # Each of the 2**nbits codebook centroids gets ≥ PQ_TRAIN_POINTS training vectors
+    nbits = int(min(8, max(PQ_MIN_BITS, np.log2(n / PQ_TRAIN_POINTS))))
+    return faiss.IndexIVFPQ(faiss.IndexFlatL2(d), d, nlist, m, nbits)
+
+
+def create_index(index_type: str, vectors: np.ndarray):
+    d = vectors.shape[1]
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(d)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif index_type == "ivfpq":
+        index = _ivfpq(vectors)
+    elif index_type == "sq8":
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit)
+    else:
+        raise ValueError(f"Unknown index type: {index_type} (choose from {', '.join(INDEX_TYPES)})")
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def set_search_params(index):
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    else:
+        try:
+            faiss.extract_index_ivf(index).nprobe = IVF_NPROBE
+        except RuntimeError:
+            pass  # not an IVF index
+    return index
+
+
+def read_index(directory: str, mmap: bool = True):
+    path = os.path.join(directory, INDEX_FILE)
+    if mmap:
+        try:
+            return set_search_params(faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY))
+        except RuntimeError as e:
+            print(f"⚠️ mmap load failed ({e}), reading index into RAM")
+    return set_search_params(faiss.read_index(path))
+
+
+def convert_index(persist_directory: str, index_type: str) -> str:
+    """
+    Builds an approximate index from the flat index's vectors. The flat index stays the
+    source of truth (sync deletes need remove_ids, which HNSW doesn't support), so run
+    this again after every sync.
+    """
+    flat = faiss.read_index(os.path.join(persist_directory, INDEX_FILE))
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+
+    out_dir = index_directory(persist_directory, index_type)
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    print(f"🏗️ Building {index_type} index over {flat.ntotal} vectors...")
+    faiss.write_index(create_index(index_type, vectors), os.path.join(tmp_dir, INDEX_FILE))
+    for name in os.listdir(persist_directory):
+        if name != INDEX_FILE:
+            shutil.copy2(os.path.join(persist_directory, name), tmp_dir)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    print(f"✅ Saved {index_type} index to {out_dir}")
+    return out_dir
+
+
+def load_vectorstore(persist_directory: str, embedding_model, index_type: str = "flat", mmap: bool = True):
+    directory = index_directory(persist_directory, index_type)
+    if not os.path.exists(os.path.join(directory, INDEX_FILE)):
+        return None
+
+    index = read_index(directory, mmap=mmap)
+    db_path = os.path.join(directory, DOCSTORE_DB)
+    if os.path.exists(db_path):
+        # Documents stay on disk; only the k hits of each search are read
+        docstore = SQLiteDocstore(db_path)
+        index_to_docstore_id = SQLiteIdMap(docstore)
+    else:
+        print("⚠️ docstore.sqlite not found, falling back to the pickled docstore (rebuild the index to export it)")
+        with open(os.path.join(directory, DOCSTORE_FILE), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embedding_model, index, docstore, index_to_docstore_id)
+
+
+# 📊 Recall-vs-latency report against the flat baseline
+def _query_vectors(embedding_model, flat, limit: int = 500) -> np.ndarray:
+    if os.path.exists(QUERY_FILE):
+        with open(QUERY_FILE, "r", encoding="utf-8") as f:
+            queries = [item["query"] for item in json.load(f)][:limit]
+        return np.array(embedding_model.embed_documents(queries), dtype=np.float32)
+    # No query file: perturbed copies of stored vectors
+    rng = np.random.default_rng(0)
+    ids = rng.choice(flat.ntotal, size=min(limit, flat.ntotal), replace=False)
+    base = flat.reconstruct_batch(ids)
+    return (base + rng.normal(scale=0.05, size=base.shape)).astype(np.float32)
+
+
+def _timed_search(index, queries: np.ndarray, k: int):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        results.append(ids[0])
+    return np.array(results), np.array(latencies) * 1000
+
+
+def recall_report(persist_directory: str, embedding_model, k: int = 10, index_types=INDEX_TYPES) -> list:
+    flat = read_index(persist_directory, mmap=False)
+    queries = _query_vectors(embedding_model, flat)
+    truth, flat_ms = _timed_search(flat, queries, k)
+
+    rows = []
+    for index_type in index_types:
+        directory = index_directory(persist_directory, index_type)
+        path = os.path.join(directory, INDEX_FILE)
+        if not os.path.exists(path):
+            continue
+        index = read_index(directory)
+        found, ms = (truth, flat_ms) if index_type == "flat" else _timed_search(index, queries, k)
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(found, truth)])
+        rows.append({
+            "type": index_type,
+            f"recall@{k}": round(float(recall), 4),
+            "p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(ms, 95)), 3),
+            "size_mb": round(os.path.getsize(path) / 2**20, 1),
+        })
+
+    print(f"\n📊 Recall vs latency ({len(queries)} queries, k={k}, baseline=flat)")
+    print(f"{'type':<8}{'recall@'+str(k):>10}{'p50 ms':>10}{'p95 ms':>10}{'size MB':>10}")
+    for r in rows:
+        print(f"{r['type']:<8}{r[f'recall@{k}']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['size_mb']:>10}")
+    return rows
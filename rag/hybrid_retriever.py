@@ -0,0 +1,150 @@
+# hybrid_retriever.py
+# Fuses exact drug-name hits, BM25 and FAISS results with reciprocal rank fusion,
+# restricted to the drug sections the question asks about (see rag/sections.py)
+import math
+from collections import Counter, defaultdict
+from typing import Any, List
+
+import numpy as np
+from langchain.schema import BaseRetriever, Document
+
+from rag.name_index import NameIndex, tokenize
+from rag.sections import (MAX_CONTEXT_CHARS, MAX_SECTION_CHARS, MIN_SECTION_CHARS, query_sections,
+                          section_of, truncate)
+
+RRF_K = 60          # standard reciprocal-rank-fusion damping constant
+FETCH_K = 20        # candidates taken from each source before fusion
+NAME_WEIGHT = 2.0   # an exact name hit should outrank anything lexical/dense
+BM25_WEIGHT = 1.0
+DENSE_WEIGHT = 1.0
+
+
+class BM25Index:
+    def __init__(self, docs: dict, k1: float = 1.5, b: float = 0.75):
+        """
+        docs: {doc_id: text}
+        """
+        self.k1, self.b = k1, b
+        self.postings = defaultdict(list)   # term -> [(doc_id, tf)]
+        self.doc_len = {}
+        for doc_id, text in docs.items():
+            terms = Counter(tokenize(text))
+            self.doc_len[doc_id] = sum(terms.values())
+            for term, tf in terms.items():
+                self.postings[term].append((doc_id, tf))
+        self.avg_len = (sum(self.doc_len.values()) / len(self.doc_len)) if self.doc_len else 0.0
+        n = len(self.doc_len)
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+
+    def search(self, query: str, k: int = FETCH_K) -> list:
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / self.avg_len)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda x: -x[1])[:k]
+
+
+def reciprocal_rank_fusion(ranked_lists: list) -> list:
+    """
+    ranked_lists: [(weight, [doc_id, ...]), ...] → [(doc_id, fused score)] best first
+    """
+    fused = defaultdict(float)
+    for weight, ids in ranked_lists:
+        for rank, doc_id in enumerate(ids):
+            fused[doc_id] += weight / (RRF_K + rank + 1)
+    return sorted(fused.items(), key=lambda x: -x[1])
+
+
+class HybridRetriever(BaseRetriever):
+    vectorstore: Any
+    name_index: NameIndex
+    drug_ids: dict          # drug key -> [doc_id] (from the index manifest)
+    bm25: Any = None
+    k: int = 3
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def name_hits(self, query: str) -> list:
+        return self.name_index.lookup(query)
+
+    def lexical_search(self, query: str, k: int = FETCH_K) -> list:
+        # SQLite docstore ranks with FTS5 bm25 on disk; the pickled docstore uses the in-memory BM25
+        if hasattr(self.vectorstore.docstore, "lexical_search"):
+            return self.vectorstore.docstore.lexical_search(query, k)
+        return [doc_id for doc_id, _ in self.bm25.search(query, k)] if self.bm25 else []
+
+    def dense_search(self, query: str, k: int = FETCH_K) -> list:
+        vector = np.array([self.vectorstore._embed_query(query)], dtype=np.float32)
+        return self.dense_search_by_vectors(vector, k)[0]
+
+    def dense_search_by_vectors(self, vectors: np.ndarray, k: int = FETCH_K) -> list:
+        _, indices = self.vectorstore.index.search(vectors, k)
+        mapping = self.vectorstore.index_to_docstore_id
+        return [[mapping[i] for i in row if i != -1] for row in indices]
+
+    def section_ids(self, key: str, sections: tuple) -> list:
+        # A drug's docs for the wanted sections, in intent order; indexes built before
+        # per-section docs only have one "full" doc per drug, which is returned as is
+        ids = self.drug_ids.get(key, [])
+        by_section = {section_of(doc_id): doc_id for doc_id in ids}
+        wanted = [by_section[s] for s in sections if s in by_section]
+        return wanted if wanted or len(ids) == 1 else []
+
+    def fetch(self, doc_ids: list) -> List[Document]:
+        docstore = self.vectorstore.docstore
+        if hasattr(docstore, "mget"):
+            found = docstore.mget(doc_ids)
+        else:
+            found = {doc_id: docstore.search(doc_id) for doc_id in doc_ids}
+        return [found[doc_id] for doc_id in doc_ids if isinstance(found.get(doc_id), Document)]
+
+    def trim(self, docs: List[Document]) -> List[Document]:
+        # Keeps the stuffed prompt to a few hundred tokens
+        trimmed, budget = [], MAX_CONTEXT_CHARS
+        for doc in docs:
+            if budget < MIN_SECTION_CHARS and trimmed:
+                break
+            text = truncate(doc.page_content, min(MAX_SECTION_CHARS, budget))
+            trimmed.append(Document(page_content=text, metadata=doc.metadata))
+            budget -= len(text)
+        return trimmed
+
+    def fuse(self, query: str, hits: list, dense_ids: list = None, sections: tuple = None) -> List[Document]:
+        sections = sections or query_sections(query)
+
+        # Drug named exactly → its wanted sections are the answer, no ranking needed
+        exact_ids = [doc_id for hit in hits if hit.exact for doc_id in self.section_ids(hit.key, sections)]
+        if exact_ids:
+            return self.trim(self.fetch(exact_ids[:self.k]))
+
+        name_ids = [doc_id for hit in hits for doc_id in self.section_ids(hit.key, sections)]
+        ranked = [
+            (NAME_WEIGHT, name_ids),
+            (BM25_WEIGHT, self.lexical_search(query)),
+            (DENSE_WEIGHT, dense_ids or []),
+        ]
+        fused = [doc_id for doc_id, _ in reciprocal_rank_fusion(ranked)]
+        # Sections matching the question's intent first, fused order otherwise
+        fused.sort(key=lambda doc_id: section_of(doc_id) not in sections)
+        return self.trim(self.fetch(fused[:self.k * 2])[:self.k])
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        hits = self.name_hits(query)
+        # Exact name in the query → its sections are fetched directly, skip the embedding model
+        if any(hit.exact for hit in hits):
+            return self.fuse(query, hits)
+        return self.fuse(query, hits, self.dense_search(query))
+
+
+def build_hybrid_retriever(vectorstore, manifest: dict, k: int = 3, name_index: NameIndex = None) -> HybridRetriever:
+    if name_index is None:
+        name_index = NameIndex.from_manifest(manifest or {})
+    drug_ids = {key: entry["ids"] for key, entry in (manifest or {}).items()}
+    docs = getattr(vectorstore.docstore, "_dict", None)
+    bm25 = BM25Index({doc_id: doc.page_content for doc_id, doc in docs.items()}) if docs else None
+    return HybridRetriever(vectorstore=vectorstore, name_index=name_index, drug_ids=drug_ids, bm25=bm25, k=k)
@@ -0,0 +1,79 @@
+# lang_detect.py
+# Bangla vs English detection by Unicode script (Bengali block U+0980–U+09FF).
+# Only mixed input with a small share of Bengali words falls back to langdetect.
+import re
+import json
+import time
+
+BN_WORD_RATIO = 0.25    # ≥ this share of Bengali words → Bangla without asking the statistical model
+TEST_FILE = "Data/test_queries.json"
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+_langdetect = None
+
+
+def _is_bengali(ch: str) -> bool:
+    return "ঀ" <= ch <= "৿"
+
+
+def script_counts(text: str) -> tuple:
+    """
+    Returns (bengali words, latin words, whether the last word is Bengali).
+    """
+    bengali = latin = 0
+    last_bengali = False
+    for word in _WORD_RE.findall(text):
+        last_bengali = any(_is_bengali(ch) for ch in word)
+        if last_bengali:
+            bengali += 1
+        elif word.isascii():
+            latin += 1
+    return bengali, latin, last_bengali
+
+
+def _statistical(text: str) -> str:
+    global _langdetect
+    if _langdetect is None:
+        from langdetect import DetectorFactory, detect
+        DetectorFactory.seed = 0     # langdetect is random unless seeded
+        _langdetect = detect
+    try:
+        return "bn" if _langdetect(text) == "bn" else "en"
+    except Exception:
+        return "en"
+
+
+def detect_language(text: str) -> str:
+    """
+    Returns "bn" or "en".
+    """
+    bengali, latin, last_bengali = script_counts(text or "")
+    if bengali == 0:
+        return "en"
+    # Bangla is verb-final: "Calcium Carbonate + Vitamin C কী?" is a Bangla question with a Latin drug name
+    if last_bengali or bengali / (bengali + latin) >= BN_WORD_RATIO:
+        return "bn"
+    return _statistical(text)
+
+
+# ✅ Micro-benchmark + accuracy check on the generated test queries
+if __name__ == "__main__":
+    from generate_test_queries import BANGLA_PATTERNS
+
+    with open(TEST_FILE, "r", encoding="utf-8") as f:
+        queries = [item["query"] for item in json.load(f)]
+
+    # Ground truth comes from the pattern each query was generated from
+    bangla_suffixes = tuple(p.replace("{name}", "") for p in BANGLA_PATTERNS)
+    truth = ["bn" if q.endswith(bangla_suffixes) else "en" for q in queries]
+
+    def bench(name, fn):
+        start = time.perf_counter()
+        predicted = [fn(q) for q in queries]
+        elapsed = time.perf_counter() - start
+        accuracy = sum(p == t for p, t in zip(predicted, truth)) / len(queries)
+        print(f"{name:<12} accuracy {accuracy:.2%}   {elapsed / len(queries) * 1e6:8.1f} µs/query")
+
+    print(f"📊 {len(queries)} queries ({truth.count('bn')} bn / {truth.count('en')} en)")
+    bench("script", detect_language)
+    bench("langdetect", _statistical)
@@ -1,74 +1,250 @@
 import os
-from deep_translator import GoogleTranslator
-from langdetect import detect
-from langchain_community.vectorstores import FAISS
-from langchain.chains import RetrievalQA
-from langchain_groq import ChatGroq
-from langchain_community.embeddings import SentenceTransformerEmbeddings
+import threading
+import numpy as np
 from dotenv import load_dotenv
+from rag.answer_cache import AnswerCache
+from rag.translation import get_translator
+from rag.lang_detect import detect_language
+from rag.stage_timing import stage
+from tools.startup import timed, is_ready
 
 # Load env
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-# 🧠 Embedding model (SentenceTransformer)
-embedding_model = SentenceTransformerEmbeddings(
-    model_name="all-MiniLM-L6-v2",  # বা অন্য মডেল
-    model_kwargs={"device": "cuda" if os.environ.get("CUDA_VISIBLE_DEVICES") else "cpu"}
-)
+persist_directory = "embeddings/faiss"
+INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
 
-# 🧠 LLM model (Groq llama-3.1-8b-instant)
-llm_model = ChatGroq(
-    groq_api_key=GROQ_API_KEY,
-    model_name="llama-3.1-8b-instant"
-)
+# Heavy components are built on first use (or by warm_up() in the background),
+# so importing this module is cheap and the bot can answer /start immediately.
+_components = {}
+_lock = threading.RLock()
 
-# Load FAISS vectorstore
-persist_directory = "embeddings/faiss"
-if os.path.exists(persist_directory):
-    vectorstore = FAISS.load_local(
-        persist_directory,
-        embedding_model,
-        allow_dangerous_deserialization=True
-    )
-else:
-    vectorstore = None
-
-retriever = vectorstore.as_retriever(search_kwargs={"k": 3}) if vectorstore else None
-qa_chain = RetrievalQA.from_chain_type(llm=llm_model, retriever=retriever) if retriever else None
-
-# 🌐 Translate helper
+
+def _component(name: str, factory):
+    if name in _components:
+        return _components[name]
+    with _lock:
+        if name not in _components:
+            with timed(name):
+                _components[name] = factory()
+    return _components[name]
+
+
+def get_embedding_model():
+    # 🧠 Embedding model (torch SentenceTransformer or int8 ONNX, see rag/embeddings.py) + query LRU cache
+    def build():
+        from rag.embeddings import get_embeddings
+        return get_embeddings()
+    return _component("embedding_model", build)
+
+
+def get_llm():
+    # 🧠 LLM model (Groq llama-3.1-8b-instant)
+    def build():
+        from langchain_groq import ChatGroq
+        return ChatGroq(
+            groq_api_key=GROQ_API_KEY,
+            model_name="llama-3.1-8b-instant"
+        )
+    return _component("llm", build)
+
+
+def get_vectorstore():
+    # Load FAISS vectorstore (flat / hnsw / ivfpq / sq8, memory-mapped)
+    def build():
+        from rag.faiss_index import load_vectorstore
+        return load_vectorstore(persist_directory, get_embedding_model(), INDEX_TYPE)
+    return _component("vectorstore", build)
+
+
+def get_manifest() -> dict:
+    def build():
+        from rag.build_index_chunked import load_manifest
+        from rag.faiss_index import index_directory
+        return load_manifest(index_directory(persist_directory, INDEX_TYPE)) or {}
+    return _component("manifest", build)
+
+
+def get_name_index():
+    # 💊 Exact + fuzzy drug-name dictionary (shared by the retriever and OCR recognition)
+    def build():
+        from rag.name_index import NameIndex
+        return NameIndex.from_manifest(get_manifest())
+    return _component("name_index", build)
+
+
+def get_retriever():
+    # 🔎 Hybrid retriever: exact drug-name index + BM25 + FAISS
+    def build():
+        from rag.hybrid_retriever import build_hybrid_retriever
+        vectorstore = get_vectorstore()
+        if vectorstore is None:
+            return None
+        return build_hybrid_retriever(vectorstore, get_manifest(), k=3, name_index=get_name_index())
+    return _component("retriever", build)
+
+
+def get_qa_chain():
+    def build():
+        from langchain.chains import RetrievalQA
+        retriever = get_retriever()
+        return RetrievalQA.from_chain_type(llm=get_llm(), retriever=retriever) if retriever else None
+    return _component("qa_chain", build)
+
+
+def get_answer_cache():
+    # 🗃️ Answer cache (exact LRU+TTL tier + semantic tier, persisted to disk);
+    # the exact tier works before the embedding model has loaded
+    return _component("answer_cache", lambda: AnswerCache(embed_fn=lambda text: get_embedding_model().embed_query(text)))
+
+
+def get_fact_table():
+    # ⚡ Precomputed menu answers (drug × intent × en/bn, see rag/fact_table.py); None if not built
+    def build():
+        from rag.fact_table import load_fact_table
+        return load_fact_table()
+    return _component("fact_table", build)
+
+
+def ready() -> bool:
+    return is_ready("qa_chain", "warm_up")
+
+
+def warm_up():
+    """
+    Loads every heavy component and runs one dummy embedding so the first real query
+    doesn't pay for lazy weight initialization.
+    """
+    get_answer_cache()
+    get_fact_table()
+    get_translator()
+    get_qa_chain()
+    with timed("warm_up"):
+        get_embedding_model().embed_query("warm up")
+
+
+# 🌐 Translate helper (memoized, batched, with timeout — see rag/translation.py)
 def translate(text: str, source: str, target: str) -> str:
-    try:
-        return GoogleTranslator(source=source, target=target).translate(text)
-    except:
-        return text
+    return get_translator().translate(text, source, target)
+
+NOT_LOADED = "❌ FAISS index not loaded. Please build index first."
+NOT_FOUND = {
+    "bn": "দুঃখিত, আমি আপনার প্রশ্নের উত্তর খুঁজে পাইনি।",
+    "en": "Sorry, I couldn't find the answer.",
+}
+
+# 🧩 Pipeline stages (shared by answer_query and rag/async_pipeline.py)
+def embed_and_search(texts: list):
+    """
+    One encode call + one FAISS search for a batch of English queries.
+    Returns (vectors, [dense doc ids per query]).
+    """
+    vectors = np.asarray(get_embedding_model().embed_documents(texts), dtype=np.float32)
+    return vectors, get_retriever().dense_search_by_vectors(vectors)
+
+
+def name_hits(query_en: str):
+    """
+    Drug-name lookup. Returns (all hits, exactly named drug keys).
+    """
+    hits = get_retriever().name_hits(query_en)
+    return hits, tuple(hit.key for hit in hits if hit.exact)
+
+
+def retrieve_context(query_en: str, lang: str, query_vector=None, dense_ids=None, hits=None):
+    """
+    CPU stage: drug-name lookup, semantic cache, hybrid retrieval. An exact drug name goes
+    straight to name + lexical evidence, with no embedding, FAISS search or semantic cache.
+    Otherwise the query is embedded once (or the batcher passes a precomputed vector + dense
+    hits) and the vector is shared by the semantic cache and FAISS.
+    Returns (cached answer or None, drug names, query vector or None, documents).
+    """
+    retriever = get_retriever()
+    if hits is None:
+        hits, names = name_hits(query_en)
+    else:
+        names = tuple(hit.key for hit in hits if hit.exact)
+    if names:
+        get_answer_cache().miss()
+        return None, names, None, retriever.fuse(query_en, hits)
+
+    if query_vector is None:
+        vectors, dense = embed_and_search([query_en])
+        query_vector, dense_ids = vectors[0], dense[0]
+
+    cached, normalized = get_answer_cache().get_similar(query_en, lang, names, query_vector)
+    if cached:
+        return cached, names, normalized, []
+    return None, names, normalized, retriever.fuse(query_en, hits, dense_ids)
+
+
+def _llm_inputs(query_en: str, docs: list) -> dict:
+    return {"input_documents": docs, "question": query_en}
+
+
+def generate_answer(query_en: str, docs: list) -> str:
+    result = get_qa_chain().combine_documents_chain.invoke(_llm_inputs(query_en, docs))
+    return result.get("output_text", "").strip()
+
+
+async def agenerate_answer(query_en: str, docs: list) -> str:
+    result = await get_qa_chain().combine_documents_chain.ainvoke(_llm_inputs(query_en, docs))
+    return result.get("output_text", "").strip()
+
+
+async def astream_answer(query_en: str, docs: list):
+    """
+    Streams the LLM answer token by token, using the same "stuff" prompt as the QA chain.
+    """
+    stuff = get_qa_chain().combine_documents_chain
+    prompt = stuff.llm_chain.prompt.format_prompt(**stuff._get_inputs(docs, question=query_en))
+    async for chunk in stuff.llm_chain.llm.astream(prompt):
+        yield getattr(chunk, "content", chunk)
+
 
 # 🎯 Main function
 def answer_query(query: str) -> str:
-    lang = detect(query)
-    if lang not in ['en', 'bn']:
-        lang = 'en'
-    
-    query_en = translate(query, source='auto', target='en')
-    
-    if qa_chain is None:
-        return "❌ FAISS index not loaded. Please build index first."
+    with stage("detect"):
+        lang = detect_language(query)
+    answer_cache = get_answer_cache()
+
+    cached = answer_cache.get(query, lang)
+    if cached:
+        return cached
+
+    with stage("translate_in"):
+        # From the detected language: English needs no call, Bangla gets the Bangla glossary
+        query_en = query if lang == "en" else translate(query, source=lang, target='en')
     
-    result = qa_chain.invoke({"query": query_en})
-    answer_en = result.get("result", "").strip()
+    if get_qa_chain() is None:
+        return NOT_LOADED
+
+    with stage("retrieve"):
+        cached, names, query_vector, docs = retrieve_context(query_en, lang)
+    if cached:
+        answer_cache.put(query, lang, cached, query_en, names, query_vector)
+        return cached
+
+    with stage("llm"):
+        answer_en = generate_answer(query_en, docs)
     
     if not answer_en:
-        return "দুঃখিত, আমি আপনার প্রশ্নের উত্তর খুঁজে পাইনি।" if lang == "bn" else "Sorry, I couldn't find the answer."
+        return NOT_FOUND[lang]
     
-    if lang == "bn":
-        return translate(answer_en, source='en', target='bn')
-    else:
-        return answer_en
+    with stage("translate_out"):
+        if lang == "bn":
+            answer = translate(answer_en, source='en', target='bn')
+        else:
+            answer = answer_en
+
+    answer_cache.put(query, lang, answer, query_en, names, query_vector)
+    return answer
 
 # ✅ Test mode
 if __name__ == "__main__":
     query = "What is Paracetamol?"
+    vectorstore = get_vectorstore()
     if vectorstore:
         docs = vectorstore.similarity_search(query, k=5)
         for i, doc in enumerate(docs):
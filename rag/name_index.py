@@ -0,0 +1,138 @@
+# name_index.py
+# In-memory exact + fuzzy lookup of drug names (brand Name and Generic Name)
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+
+MAX_EDIT_DISTANCE = 1   # SymSpell-style delete distance for fuzzy matches
+MIN_FUZZY_LENGTH = 5    # shorter words are too ambiguous to fuzzy-match
+MAX_PHRASE_TOKENS = 6   # longest name (in words) we try to match
+
+# Score per match kind; exact brand names beat exact generics beat typos
+SCORES = {
+    ("exact", "name"): 1.0,
+    ("exact", "generic"): 0.9,
+    ("fuzzy", "name"): 0.7,
+    ("fuzzy", "generic"): 0.6,
+}
+
+# Query words that are never drug names on their own
+STOPWORDS = {
+    "what", "is", "are", "the", "of", "about", "me", "tell", "give", "information", "info",
+    "uses", "use", "explain", "side", "effects", "effect", "dose", "dosage", "for", "and",
+    "how", "this", "medicine", "drug", "tablet", "capsule", "syrup", "a", "an", "in", "to",
+    "এর", "কী", "কি", "সম্পর্কে", "বলুন", "ব্যবহার", "ব্যাখ্যা", "করুন", "তথ্য", "দিন",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9ঀ-৿]+")
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def normalize(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+def _deletes(word: str, distance: int) -> set:
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i+1:] for w in frontier for i in range(len(w))}
+        results |= frontier
+    return results
+
+
+def _within_distance(a: str, b: str, max_distance: int) -> bool:
+    # Banded Levenshtein; names are short so this is cheap
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j-1] + 1, prev[j-1] + (ca != cb))
+        if min(cur) > max_distance:
+            return False
+        prev = cur
+    return prev[-1] <= max_distance
+
+
+@dataclass
+class NameHit:
+    key: str        # drug key from the index manifest ("Name|Generic Name")
+    score: float
+    matched: str    # normalized phrase found in the query
+    kind: str       # "name" or "generic"
+    exact: bool
+
+
+class NameIndex:
+    def __init__(self):
+        self.names = defaultdict(list)     # normalized name -> [(key, kind)]
+        self.deletes = defaultdict(set)    # delete variant -> {normalized name}
+        self.max_tokens = 1
+
+    @classmethod
+    def from_manifest(cls, manifest: dict) -> "NameIndex":
+        index = cls()
+        for key, entry in manifest.items():
+            index.add(entry.get("name", ""), key, "name")
+            index.add(entry.get("generic", ""), key, "generic")
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name: str, key: str, kind: str):
+        norm = normalize(name or "")
+        if not norm or norm in STOPWORDS:
+            return
+        if (key, kind) not in self.names[norm]:
+            self.names[norm].append((key, kind))
+        self.max_tokens = min(MAX_PHRASE_TOKENS, max(self.max_tokens, norm.count(" ") + 1))
+        if len(norm) >= MIN_FUZZY_LENGTH:
+            for variant in _deletes(norm, MAX_EDIT_DISTANCE):
+                self.deletes[variant].add(norm)
+
+    def _fuzzy(self, phrase: str) -> set:
+        candidates = set()
+        for variant in _deletes(phrase, MAX_EDIT_DISTANCE):
+            candidates |= self.deletes.get(variant, set())
+        return {c for c in candidates if _within_distance(phrase, c, MAX_EDIT_DISTANCE)}
+
+    def lookup(self, query: str, limit: int = 20) -> list:
+        """
+        Finds drug names mentioned in the query. Longest phrases win; fuzzy matching
+        is only tried for words not already covered by an exact match.
+        """
+        tokens = tokenize(query)
+        covered = [False] * len(tokens)
+        best = {}
+
+        def record(norm, exact, start, end):
+            for key, kind in self.names[norm]:
+                score = SCORES[("exact" if exact else "fuzzy", kind)]
+                if key not in best or best[key].score < score:
+                    best[key] = NameHit(key, score, " ".join(tokens[start:end]), kind, exact)
+            for i in range(start, end):
+                covered[i] = True
+
+        for exact in (True, False):
+            for n in range(min(self.max_tokens, len(tokens)), 0, -1):
+                for start in range(len(tokens) - n + 1):
+                    if any(covered[start:start+n]):
+                        continue
+                    phrase = " ".join(tokens[start:start+n])
+                    if n == 1 and (phrase in STOPWORDS or len(phrase) < 3):
+                        continue
+                    if exact:
+                        if phrase in self.names:
+                            record(phrase, True, start, start + n)
+                    elif len(phrase) >= MIN_FUZZY_LENGTH:
+                        for norm in self._fuzzy(phrase):
+                            record(norm, False, start, start + n)
+
+        hits = sorted(best.values(), key=lambda h: (-h.score, h.key))
+        return hits[:limit]
@@ -0,0 +1,227 @@
+# retrieval_benchmark.py
+# Offline retrieval benchmark: recall@k, MRR and queries/s of the index built by
+# build_index_chunked.py, with the drug named in each test query as ground truth.
+# Two query sets:
+#   - names       the test queries; each names its drug, and hybrid mode answers an exact
+#                 name straight from the name index, so its recall hardly depends on the index
+#   - references  each query's reference answer with the drug's names blanked out; only BM25
+#                 and the dense index can find these, so index types and backends show here
+# Translation and the LLM are replaced by local stubs, nothing touches the network, and
+# the query set and order are fixed, so runs with different index types, embedding
+# backends or chunking rules can be compared directly.
+#   python -m rag.retrieval_benchmark --index-type flat hnsw --backend torch onnx
+#   python -m rag.retrieval_benchmark --out results.jsonl     # append one JSON row per run
+#   python -m rag.retrieval_benchmark --queries references     # skip the name-driven set
+import os
+import json
+import time
+import argparse
+import platform
+
+import numpy as np
+
+from rag.name_index import normalize
+from rag.faiss_index import INDEX_TYPES, index_directory, load_vectorstore
+from rag.build_index_chunked import load_manifest, manifest_version, persist_directory
+
+QUERY_FILES = ("Data/test_queries.json", "Data/test_hundred_queries.json")
+KS = (1, 3, 5, 10)
+MODES = ("dense", "hybrid")
+QUERY_SETS = ("names", "references")
+REFERENCE_WORDS = 30        # words of the reference answer used as a reference query
+
+
+def offline():
+    """
+    Swaps the translator and the LLM for local stubs, so no query leaves the machine.
+    """
+    from langchain_community.llms.fake import FakeListLLM
+    from rag import translation, langchain_pipeline
+
+    translation.set_backend(translation.StubBackend())
+    langchain_pipeline._components["llm"] = FakeListLLM(responses=["stub answer"])
+
+
+def load_queries(paths=QUERY_FILES) -> list:
+    # Every distinct test item ({"query", "reference"}) from the test files, in file order
+    items, seen = [], set()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for item in json.load(f):
+                if item["query"] not in seen:
+                    seen.add(item["query"])
+                    items.append(item)
+    return items
+
+
+def ground_truth(queries: list, manifest: dict) -> list:
+    """
+    [(query, {relevant drug keys})] for queries that name a drug in the index. The longest
+    brand or generic name found in the query wins; every entry carrying it counts as relevant.
+    Plain token matching, independent of the retriever's own name index.
+    """
+    names = {}
+    for key, entry in manifest.items():
+        for name in (entry.get("name"), entry.get("generic")):
+            norm = normalize(name or "")
+            if norm:
+                names.setdefault(norm, set()).add(key)
+    longest = max((n.count(" ") + 1 for n in names), default=1)
+
+    labelled = []
+    for query in queries:
+        tokens = normalize(query).split()
+        found = None
+        for n in range(min(longest, len(tokens)), 0, -1):
+            for start in range(len(tokens) - n + 1):
+                phrase = " ".join(tokens[start:start + n])
+                if phrase in names:
+                    found = names[phrase]
+                    break
+            if found:
+                break
+        if found:
+            labelled.append((query, found))
+    return labelled
+
+
+def reference_truth(items: list, manifest: dict) -> list:
+    """
+    [(reference query, {relevant drug keys})]: the reference answer of every labelled test
+    query, without any word of the relevant drugs' brand or generic names, cut to
+    REFERENCE_WORDS words. The name index has nothing to match, so hybrid mode has to rank
+    these with BM25 and the dense index.
+    """
+    references = {item["query"]: item.get("reference") or "" for item in items}
+    labelled = []
+    for query, relevant in ground_truth(list(references), manifest):
+        blanked = {token for key in relevant for field in ("name", "generic")
+                   for token in normalize(manifest[key].get(field) or "").split()}
+        words = [word for word in normalize(references[query]).split() if word not in blanked]
+        if words:
+            labelled.append((" ".join(words[:REFERENCE_WORDS]), relevant))
+    return labelled
+
+
+def score(ranked: list, relevant: set) -> dict:
+    # ranked: drug keys in retrieval order (a drug can appear once per section doc)
+    rank = next((i for i, key in enumerate(ranked, 1) if key in relevant), None)
+    row = {f"recall@{k}": float(rank is not None and rank <= k) for k in KS}
+    row["mrr"] = 1.0 / rank if rank else 0.0
+    return row
+
+
+def run(embedding_model, index_type: str = "flat", mode: str = "dense", queries: list = None,
+        batch_size: int = 32, query_set: str = "names") -> dict:
+    from rag.hybrid_retriever import build_hybrid_retriever
+    from rag.langchain_pipeline import translate
+    from rag.lang_detect import detect_language
+
+    vectorstore = load_vectorstore(persist_directory, embedding_model, index_type)
+    if vectorstore is None:
+        raise FileNotFoundError(f"No {index_type} index under {persist_directory}")
+    directory = index_directory(persist_directory, index_type)
+    manifest = load_manifest(directory) or load_manifest() or {}
+    key_of = {doc_id: key for key, entry in manifest.items() for doc_id in entry["ids"]}
+    retriever = build_hybrid_retriever(vectorstore, manifest, k=max(KS))
+
+    items = queries if queries is not None else load_queries()
+    if query_set == "references":
+        labelled = reference_truth(items, manifest)
+    else:
+        labelled = ground_truth([item["query"] for item in items], manifest)
+    if not labelled:
+        raise ValueError("No test query names a drug in this index")
+    texts = [translate(query, detect_language(query), 'en') for query, _ in labelled]
+
+    # Queries the name index answers on its own, without the dense index
+    named = [any(hit.exact for hit in retriever.name_hits(text)) for text in texts]
+
+    # Warm-up so lazy initialization isn't timed
+    retriever.dense_search_by_vectors(np.asarray(embedding_model.embed_documents(texts[:1]), dtype=np.float32))
+
+    start = time.perf_counter()
+    rankings = []
+    if mode == "dense":
+        # Batched like the async pipeline's embedding batcher
+        for i in range(0, len(texts), batch_size):
+            vectors = np.asarray(embedding_model.embed_documents(texts[i:i + batch_size]), dtype=np.float32)
+            for ids in retriever.dense_search_by_vectors(vectors, k=max(KS)):
+                rankings.append([key_of.get(doc_id, doc_id.split("::")[0]) for doc_id in ids])
+    else:
+        # What retrieve_context does per query, minus the answer cache
+        for text in texts:
+            hits = retriever.name_hits(text)
+            dense = None
+            if not any(hit.exact for hit in hits):
+                vectors = np.asarray(embedding_model.embed_documents([text]), dtype=np.float32)
+                dense = retriever.dense_search_by_vectors(vectors)[0]
+            docs = retriever.fuse(text, hits, dense)
+            rankings.append([doc.metadata.get("key") for doc in docs])
+    elapsed = time.perf_counter() - start
+
+    rows = [score(ranked, relevant) for ranked, (_, relevant) in zip(rankings, labelled)]
+    result = {metric: round(float(np.mean([r[metric] for r in rows])), 4) for metric in rows[0]}
+    result.update({
+        "mode": mode,
+        "index_type": index_type,
+        "query_set": query_set,
+        "queries": len(labelled),
+        "name_hits": sum(named),
+        "qps": round(len(labelled) / elapsed, 1),
+        "docs": vectorstore.index.ntotal,
+        "manifest_version": manifest_version(directory) or manifest_version(),
+    })
+    return result
+
+
+def report(results: list) -> str:
+    columns = [f"recall@{k}" for k in KS] + ["mrr", "qps"]
+    lines = [f"{'backend':<8}{'index':<8}{'mode':<8}{'queries':<12}{'n':>6}{'named':>7}"
+             + "".join(f"{c:>11}" for c in columns)]
+    for r in results:
+        lines.append(f"{r['backend']:<8}{r['index_type']:<8}{r['mode']:<8}{r['query_set']:<12}{r['queries']:>6}"
+                     f"{r['name_hits']:>7}" + "".join(f"{r[c]:>11}" for c in columns))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from rag.embeddings import get_embeddings
+
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark (recall@k, MRR, QPS)")
+    parser.add_argument("--index-type", nargs="+", choices=INDEX_TYPES, default=["flat"])
+    parser.add_argument("--backend", nargs="+", choices=("torch", "onnx"), default=[os.getenv("EMBEDDING_BACKEND", "torch")])
+    parser.add_argument("--mode", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--queries", nargs="+", choices=QUERY_SETS, default=list(QUERY_SETS))
+    parser.add_argument("--limit", type=int, default=None, help="only the first N queries")
+    parser.add_argument("--threads", type=int, default=1, help="embedding threads (fixed for comparable QPS)")
+    parser.add_argument("--out", default=None, help="append results as JSON lines to this file")
+    args = parser.parse_args()
+
+    # Offline and repeatable: cached model weights only, stub translator/LLM, fixed threads
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    offline()
+    queries = load_queries()[:args.limit]
+
+    results = []
+    for backend in args.backend:
+        # No query cache: repeated runs must not get faster by remembering the queries
+        embedding_model = get_embeddings(backend, cache=False, threads=args.threads)
+        for index_type in args.index_type:
+            for query_set in args.queries:
+                for mode in args.mode:
+                    result = run(embedding_model, index_type, mode, queries, query_set=query_set)
+                    result.update({"backend": backend, "threads": args.threads, "machine": platform.machine(),
+                                   "time": time.strftime("%Y-%m-%d %H:%M:%S")})
+                    results.append(result)
+                    print(f"✅ {backend}/{index_type}/{query_set}/{mode}: recall@3 {result['recall@3']}, "
+                          f"MRR {result['mrr']}, {result['qps']} q/s")
+
+    print("\n📊 Retrieval benchmark (named = queries the name index answers without the dense index)")
+    print(report(results))
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
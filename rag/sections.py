@@ -0,0 +1,96 @@
+# sections.py
+# Splits a drug entry into section documents (indications, side effects, dosage, ...)
+# and maps questions to the sections that answer them, so the LLM prompt only
+# carries the relevant part of a drug entry.
+import re
+
+# Section → keywords matched against dataset field names (first match wins, in this order)
+SECTIONS = {
+    "side_effects": ("side effect", "adverse", "undesirable"),
+    "pediatric": ("pediatric", "paediatric", "child", "special population"),
+    "dosage": ("dosage", "dose", "administration", "direction"),
+    "pharmacology": ("pharmacolog", "mode of action", "mechanism", "pharmacokinetic"),
+    "precautions": ("precaution", "warning", "contraindication", "interaction", "pregnancy",
+                    "lactation", "overdose"),
+    "indications": ("indication", "used for", "uses"),
+}
+OVERVIEW = "overview"   # name, generic, type, class, ... and any field not matched above
+
+SECTION_TITLES = {
+    OVERVIEW: "Overview",
+    "indications": "Indications",
+    "side_effects": "Side Effects",
+    "pediatric": "Pediatric Use",
+    "dosage": "Dosage & Administration",
+    "pharmacology": "Pharmacology",
+    "precautions": "Precautions",
+}
+
+# Question intent → sections, checked against the (English) query
+INTENT_PATTERNS = [
+    (r"side[\s-]?effects?|adverse|reactions?|পার্শ্বপ্রতিক্রিয়া", ("side_effects",)),
+    (r"child|children|kids?|pediatric|paediatric|infants?|শিশু", ("pediatric", "dosage")),
+    (r"dos(e|es|age)|how (much|often|to take|is .* (used|taken))|usage|administ|ডোজ|সেবন", ("dosage",)),
+    (r"pharmacolog|mechanism|mode of action|how does .* work|ফার্মাকোলজি", ("pharmacology",)),
+    (r"pregnan|lactation|breast|contraindicat|interact|warning|precaution|overdose", ("precautions",)),
+    (r"used for|\buses?\b|indicat|treat|what is .* for|ব্যবহার", ("indications",)),
+]
+DEFAULT_SECTIONS = (OVERVIEW, "indications")   # "What is X?" and anything unrecognised
+
+# OCR menu categories (bot/handlers.py handle_query_selection) → sections
+MENU_SECTIONS = {
+    "general": (OVERVIEW, "indications"),
+    "side_effects": ("side_effects",),
+    "usage": ("dosage", "indications"),
+    "pharmacology": ("pharmacology",),
+    "pediatric": ("pediatric", "dosage"),
+}
+
+# Prompt budget: each section is cut to MAX_SECTION_CHARS, the whole context to MAX_CONTEXT_CHARS
+MAX_SECTION_CHARS = 900
+MAX_CONTEXT_CHARS = 1800   # ≈ 450 tokens
+MIN_SECTION_CHARS = 200    # a leftover budget smaller than this isn't worth a document
+
+
+def field_section(field: str) -> str:
+    name = field.lower()
+    for section, keywords in SECTIONS.items():
+        if any(keyword in name for keyword in keywords):
+            return section
+    return OVERVIEW
+
+
+def split_entry(entry: dict) -> dict:
+    """
+    {section: [(field, text), ...]} for every non-empty string field, in dataset order.
+    """
+    sections = {}
+    for field, value in entry.items():
+        if value and isinstance(value, str) and value.strip():
+            sections.setdefault(field_section(field), []).append((field, value.strip()))
+    return sections
+
+
+def section_of(doc_id: str) -> str:
+    return doc_id.rsplit("::", 1)[-1]
+
+
+def query_sections(query: str) -> tuple:
+    """
+    Sections that answer the question, most specific intent first; DEFAULT_SECTIONS if none match.
+    """
+    text = query.lower()
+    found = []
+    for pattern, sections in INTENT_PATTERNS:
+        if re.search(pattern, text):
+            found.extend(s for s in sections if s not in found)
+    return tuple(found) or DEFAULT_SECTIONS
+
+
+def truncate(text: str, limit: int) -> str:
+    # Cut at the last sentence end before the limit, so the LLM never sees half a sentence
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    end = max(cut.rfind(". "), cut.rfind(".\n"), cut.rfind("।"))
+    return (cut[:end + 1] if end > limit // 2 else cut.rsplit(" ", 1)[0]) + " …"
@@ -0,0 +1,41 @@
+# stage_timing.py
+# Per-request pipeline stage timings (detect, translate_in, retrieve, llm, translate_out).
+# A caller that wants the breakdown wraps the request in collect(); the pipeline marks its
+# stages with stage(name). The dict travels in a contextvar, so concurrent requests (threads
+# or asyncio tasks) each fill their own. Every stage is also recorded in the
+# pipeline_stage_seconds histogram of tools/metrics.py.
+import time
+import contextvars
+from contextlib import contextmanager
+
+from tools import metrics
+
+STAGES = ("detect", "translate_in", "retrieve", "llm", "translate_out")
+
+_current = contextvars.ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.histogram("pipeline_stage_seconds", "Answer pipeline stage latency").observe(elapsed, stage=name)
+        timings = _current.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+@contextmanager
+def collect():
+    """
+    with collect() as timings: answer = answer_query(q)   # timings: stage -> seconds
+    """
+    timings = {}
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
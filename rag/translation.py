@@ -0,0 +1,255 @@
+# translation.py
+# Translation layer used by the pipeline:
+#   - sentence-level memoization + a phrase glossary, so repeated phrases never hit the network;
+#     glossary terms inside a sentence (drug names, section words) are swapped for placeholders
+#     before the backend sees it and put back, in the target language, afterwards
+#   - micro-batching: sentences requested within BATCH_WINDOW are sent as one backend call
+#   - hard timeouts; on failure the original text is returned (same contract as before)
+#   - pluggable backends: Google (deep_translator), Argos (offline) or a stub for tests
+import os
+import re
+import json
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "google")
+TRANSLATE_TIMEOUT = float(os.getenv("TRANSLATE_TIMEOUT", 6))
+GLOSSARY_FILE = "data/glossary.json"
+CACHE_SIZE = 20000
+BATCH_WINDOW = 0.02       # seconds to wait for more sentences before calling the backend
+BATCH_MAX_CHARS = 4500    # Google's web endpoint rejects requests over 5000 chars
+BACKEND_WORKERS = 4       # batches in flight at once, so one slow call doesn't block the next batch
+
+# Built-in phrases (query words + UI strings). data/glossary.json can add drug-name glossaries.
+GLOSSARY = {
+    ("bn", "en"): {
+        "পার্শ্বপ্রতিক্রিয়া": "side effects",
+        "ব্যবহার": "use",
+        "ডোজ": "dose",
+        "শিশুদের ব্যবহার": "pediatric use",
+    },
+    ("en", "bn"): {
+        "Side effects": "পার্শ্বপ্রতিক্রিয়া",
+        "Dosage": "ডোজ",
+    },
+}
+
+_SPLIT_RE = re.compile(r"(\s*\n\s*|(?<=[.!?।])\s+)")
+# Translators keep "[[3]]" as is, but may turn its digits into Bangla ones or pad it with spaces
+_PLACEHOLDER_RE = re.compile(r"\[\[\s*([0-9০-৯]+)\s*\]\]")
+_BANGLA_DIGITS = str.maketrans("০১২৩৪৫৬৭৮৯", "0123456789")
+_WORD = r"\w\u0980-\u09FF"       # Bangla vowel signs aren't \w, but they are part of a word
+
+
+def split_sentences(text: str) -> list:
+    """
+    Returns alternating [sentence, separator, sentence, ...] so join() restores the text.
+    """
+    return _SPLIT_RE.split(text)
+
+
+# 🔌 Backends: translate_batch(texts, source, target) -> list of translations
+class GoogleBackend:
+    def translate_batch(self, texts: list, source: str, target: str) -> list:
+        from deep_translator import GoogleTranslator
+        translator = GoogleTranslator(source=source, target=target)
+        # One request for the whole batch: sentences joined by newlines, split back afterwards
+        joined = translator.translate("\n".join(texts))
+        parts = joined.split("\n") if joined else []
+        if len(parts) == len(texts):
+            return [p.strip() for p in parts]
+        return [translator.translate(t) for t in texts]
+
+
+class ArgosBackend:
+    """
+    Offline backend (pip install argostranslate, then install the bn↔en packages).
+    """
+    def __init__(self):
+        import argostranslate.translate
+        self.argos = argostranslate.translate
+
+    def translate_batch(self, texts: list, source: str, target: str) -> list:
+        if source == "auto":
+            source = "bn" if any("ঀ" <= ch <= "৿" for ch in "".join(texts)) else "en"
+        return [self.argos.translate(t, source, target) for t in texts]
+
+
+class StubBackend:
+    """
+    Deterministic stand-in for tests and offline benchmarks: looks texts up in a
+    dict and otherwise returns them unchanged.
+    """
+    def __init__(self, mapping: dict = None):
+        self.mapping = mapping or {}
+        self.calls = 0
+
+    def translate_batch(self, texts: list, source: str, target: str) -> list:
+        self.calls += 1
+        return [self.mapping.get(t, t) for t in texts]
+
+
+BACKENDS = {"google": GoogleBackend, "argos": ArgosBackend, "stub": StubBackend}
+
+
+class Translator:
+    def __init__(self, backend=None, timeout: float = TRANSLATE_TIMEOUT):
+        self.backend = backend or BACKENDS[TRANSLATION_BACKEND]()
+        self.timeout = timeout
+        self.cache = OrderedDict()          # (source, target, sentence) -> translation
+        self.glossary = {pair: dict(terms) for pair, terms in GLOSSARY.items()}
+        self.term_patterns = {}             # language pair -> (regex over its glossary terms, lowercased glossary)
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()        # (source, target, sentence, Future)
+        self.executor = ThreadPoolExecutor(max_workers=BACKEND_WORKERS, thread_name_prefix="translate")
+        self.worker = threading.Thread(target=self._batch_loop, daemon=True)
+        self.worker.start()
+        self._load_glossary()
+
+    def _load_glossary(self):
+        if not os.path.exists(GLOSSARY_FILE):
+            return
+        with open(GLOSSARY_FILE, "r", encoding="utf-8") as f:
+            for pair, terms in json.load(f).items():      # {"bn-en": {...}, "en-bn": {...}}
+                self.glossary.setdefault(tuple(pair.split("-")), {}).update(terms)
+
+    def _glossary(self, source: str, target: str) -> dict:
+        # Queries arrive with their detected language; "auto" means Bangla, the only language translated to English
+        return self.glossary.get(("bn" if source == "auto" else source, target), {})
+
+    def _protect(self, source: str, target: str, sentence: str):
+        """
+        Replaces glossary terms in the sentence with [[n]] placeholders.
+        Returns (masked sentence, [target-language term for each placeholder]).
+        """
+        pair = ("bn" if source == "auto" else source, target)
+        if pair not in self.term_patterns:
+            glossary = self._glossary(source, target)
+            terms = sorted(glossary, key=len, reverse=True)      # longest first: "শিশুদের ব্যবহার" before "ব্যবহার"
+            pattern = re.compile(
+                rf"(?<![{_WORD}])(?:{'|'.join(map(re.escape, terms))})(?![{_WORD}])", re.IGNORECASE
+            ) if terms else None
+            self.term_patterns[pair] = (pattern, {k.lower(): v for k, v in glossary.items()})
+        pattern, lowered = self.term_patterns[pair]
+        if pattern is None:
+            return sentence, []
+
+        replacements = []
+
+        def mask(match):
+            replacements.append(lowered[match.group(0).lower()])
+            return f"[[{len(replacements) - 1}]]"
+
+        return pattern.sub(mask, sentence), replacements
+
+    @staticmethod
+    def _restore(translation: str, replacements: list) -> str:
+        def unmask(match):
+            index = int(match.group(1).translate(_BANGLA_DIGITS))
+            return replacements[index] if index < len(replacements) else ""
+        return _PLACEHOLDER_RE.sub(unmask, translation) if replacements else translation
+
+    def _lookup(self, source: str, target: str, sentence: str):
+        glossary = self._glossary(source, target)
+        if sentence in glossary:
+            return glossary[sentence]
+        key = (source, target, sentence)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        return None
+
+    def _remember(self, source: str, target: str, sentence: str, translation: str):
+        with self.lock:
+            self.cache[(source, target, sentence)] = translation
+            while len(self.cache) > CACHE_SIZE:
+                self.cache.popitem(last=False)
+
+    def _batch_loop(self):
+        while True:
+            batch = [self.pending.get()]
+            size = len(batch[0][2])
+            try:
+                while size < BATCH_MAX_CHARS:
+                    item = self.pending.get(timeout=BATCH_WINDOW)
+                    batch.append(item)
+                    size += len(item[2])
+            except queue.Empty:
+                pass
+
+            groups = {}
+            for source, target, sentence, future in batch:
+                groups.setdefault((source, target), []).append((sentence, future))
+            for (source, target), items in groups.items():
+                self.executor.submit(self._run_batch, source, target, items)
+
+    def _run_batch(self, source: str, target: str, items: list):
+        unique = list(dict.fromkeys(s for s, _ in items))
+        try:
+            results = dict(zip(unique, self.backend.translate_batch(unique, source, target)))
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        for sentence, future in items:
+            future.set_result(results.get(sentence) or sentence)
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        if not text or not text.strip() or source == target:
+            return text
+
+        parts = split_sentences(text)
+        futures = {}
+        for i in range(0, len(parts), 2):          # even indices are sentences, odd are separators
+            sentence = parts[i]
+            if not sentence.strip():
+                continue
+            found = self._lookup(source, target, sentence)
+            if found is not None:
+                parts[i] = found
+            else:
+                masked, replacements = self._protect(source, target, sentence)
+                future = Future()
+                self.pending.put((source, target, masked, future))
+                futures[i] = (sentence, replacements, future)
+
+        for i, (sentence, replacements, future) in futures.items():
+            try:
+                parts[i] = self._restore(future.result(timeout=self.timeout), replacements)
+                self._remember(source, target, sentence, parts[i])
+            except FutureTimeout:
+                print(f"⚠️ Translation timed out after {self.timeout}s ({source}→{target})")
+                return text
+            except Exception as e:
+                print(f"⚠️ Translation failed ({source}→{target}): {e}")
+                return text
+        return "".join(parts)
+
+
+_translator = None
+_translator_lock = threading.Lock()
+
+
+def get_translator() -> Translator:
+    global _translator
+    with _translator_lock:
+        if _translator is None:
+            _translator = Translator()
+        return _translator
+
+
+def set_backend(backend) -> Translator:
+    """
+    Swap the backend (e.g. StubBackend() in tests); also resets the memo cache.
+    """
+    global _translator
+    with _translator_lock:
+        _translator = Translator(backend=backend)
+        return _translator
+
+
+def translate(text: str, source: str, target: str) -> str:
+    return get_translator().translate(text, source, target)
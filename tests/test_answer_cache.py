@@ -0,0 +1,37 @@
+# test_answer_cache.py
+from rag import langchain_pipeline as pipeline
+from rag.answer_cache import AnswerCache
+from rag.name_index import NameHit
+
+
+class NameOnlyRetriever:
+    def name_hits(self, query_en):
+        return [NameHit("Napa|Paracetamol", 1.0, "napa", "name", True)]
+
+    def fuse(self, query_en, hits, dense_ids=None):
+        return ["napa doc"]
+
+
+def test_drug_name_query_miss_is_counted(tmp_path, monkeypatch):
+    cache = AnswerCache(path=str(tmp_path / "answers.sqlite"))
+    monkeypatch.setattr(pipeline, "get_answer_cache", lambda: cache)
+    monkeypatch.setattr(pipeline, "get_retriever", lambda: NameOnlyRetriever())
+
+    assert cache.get("What is Napa?", "en") is None
+    cached, names, vector, docs = pipeline.retrieve_context("What is Napa?", "en")
+
+    assert (cached, names, vector, docs) == (None, ("Napa|Paracetamol",), None, ["napa doc"])
+    assert cache.stats == {"exact": 0, "semantic": 0, "miss": 1}
+
+    cache.put("What is Napa?", "en", "Napa is paracetamol.", "What is Napa?", names)
+    assert cache.get("what is napa", "en") == "Napa is paracetamol."
+    assert cache.stats == {"exact": 1, "semantic": 0, "miss": 1}
+
+
+def test_queries_without_words_do_not_share_an_entry(tmp_path):
+    cache = AnswerCache(path=str(tmp_path / "answers.sqlite"))
+    cache.put("💊💊", "en", "answer to pills")
+
+    assert cache.get("💊💊", "en") == "answer to pills"
+    assert cache.get("???", "en") is None
+    assert cache.get("🤒", "en") is None
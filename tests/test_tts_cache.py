@@ -0,0 +1,27 @@
+# test_tts_cache.py
+import os
+import time
+import asyncio
+
+from tools import tts
+from tools.tts import TTSService
+
+
+def test_file_id_hits_survive_prune(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "TTS_CACHE_MAX_FILES", 2)
+    service = TTSService(cache_dir=str(tmp_path), workers=1)
+
+    keys = [service.cache_key(f"answer {i}", "en") for i in range(3)]
+    old = time.time() - 3600
+    for i, key in enumerate(keys):
+        service._write(key, b"ogg")
+        os.utime(service._path(key), (old + i, old + i))
+    # The oldest clip has been uploaded and is only ever re-sent by file_id from now on
+    service.remember_file_id(keys[0], "file-0")
+    assert asyncio.run(service.speak("answer 0", "en")) == (keys[0], None, "file-0")
+
+    service._prune()
+
+    assert os.path.exists(service._path(keys[0]))
+    assert service.file_ids == {keys[0]: "file-0"}
+    assert not os.path.exists(service._path(keys[1]))     # now the least recently used
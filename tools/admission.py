@@ -0,0 +1,217 @@
+# admission.py
+# Admission control in front of the expensive handlers (LLM, Tesseract, speech recognition):
+#   - each chat has a token bucket; text costs 1 token, voice 2, a photo 3
+#   - a fixed number of slots run work at once; the rest wait in one bounded queue,
+#     served by priority (text > voice > photo), oldest first within a priority
+#   - when the queue is full, a newcomer pushes out the lowest-priority, newest waiter (or
+#     is turned away itself), and nobody waits longer than its kind's MAX_WAIT
+# Shed requests raise Busy; the handlers answer those with a "busy, try again" reply.
+# Reminder sends stay out of this entirely: they are cheap, already paced by the sender in
+# tools/rate_limit.py, and must not tie up slots while that sender waits on its buckets.
+import os
+import time
+import heapq
+import asyncio
+import functools
+import itertools
+
+from tools import metrics
+from tools.rate_limit import ChatBuckets
+
+ADMISSION_SLOTS = int(os.getenv("ADMISSION_SLOTS", 32))          # expensive requests running at once
+ADMISSION_QUEUE = int(os.getenv("ADMISSION_QUEUE", 200))         # requests waiting for a slot
+CHAT_RATE = float(os.getenv("ADMISSION_CHAT_RATE", 0.5))         # tokens / second per chat
+CHAT_BURST = float(os.getenv("ADMISSION_CHAT_BURST", 6))         # tokens a quiet chat can spend at once
+
+PRIORITIES = {"text": 0, "voice": 1, "photo": 2}
+COSTS = {"text": 1.0, "voice": 2.0, "photo": 3.0}
+MAX_WAIT = {"text": 15.0, "voice": 20.0, "photo": 20.0}         # seconds in the queue before giving up
+BUSY_REPLY_INTERVAL = 10.0      # at most one "busy" reply per chat this often (a spammer gets silence)
+BUSY_TEXT = "⏳ এখন অনেক অনুরোধ আসছে, একটু পরে আবার চেষ্টা করুন।\n(Busy right now, please try again shortly.)"
+
+
+class Busy(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason      # "rate" | "overload" | "timeout"
+
+
+class AdmissionController:
+    def __init__(self, slots: int = ADMISSION_SLOTS, queue_size: int = ADMISSION_QUEUE,
+                 chat_rate: float = CHAT_RATE, chat_burst: float = CHAT_BURST):
+        self.free = slots
+        self.queue_size = queue_size
+        self.chat_buckets = ChatBuckets(chat_rate, capacity=chat_burst)
+        self.waiting = []                 # heap of [priority, seq, future, kind]
+        self.seq = itertools.count()
+        self.busy_replied = {}            # chat id -> last "busy" reply time
+
+    # 🎟️ Slots
+    async def _acquire(self, kind: str):
+        if self.free and not self.waiting:
+            self.free -= 1
+            return
+
+        priority = PRIORITIES[kind]
+        if len(self.waiting) >= self.queue_size:
+            victim = max(self.waiting, key=lambda w: (w[0], w[1]))
+            if victim[0] > priority:
+                self.waiting.remove(victim)
+                heapq.heapify(self.waiting)
+                victim[2].set_exception(Busy("overload"))
+            else:
+                raise Busy("overload")
+
+        entry = [priority, next(self.seq), asyncio.get_running_loop().create_future(), kind]
+        heapq.heappush(self.waiting, entry)
+        granted = False
+        try:
+            await asyncio.wait_for(entry[2], MAX_WAIT[kind])
+            granted = True
+        except asyncio.TimeoutError:
+            raise Busy("timeout")
+        finally:
+            future = entry[2]
+            if granted:
+                pass
+            elif future.done() and not future.cancelled() and future.exception() is None:
+                self._release()       # the slot arrived just as we gave up: pass it on
+            elif entry in self.waiting:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+
+    def _release(self):
+        # Hand the slot straight to the best waiter, or give it back
+        while self.waiting:
+            future = heapq.heappop(self.waiting)[2]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.free += 1
+
+    async def run(self, kind: str, chat_id, work):
+        """
+        Awaits work() once admitted; raises Busy if the request is shed.
+        """
+        if chat_id is not None and not self.chat_buckets.get(chat_id).try_acquire(COSTS[kind]):
+            raise Busy("rate")
+
+        start = time.perf_counter()
+        await self._acquire(kind)
+        metrics.histogram("admission_wait_seconds", "Time queued for a work slot").observe(
+            time.perf_counter() - start, kind=kind)
+        try:
+            return await work()
+        finally:
+            self._release()
+
+    def should_reply_busy(self, chat_id) -> bool:
+        now = time.monotonic()
+        if now - self.busy_replied.get(chat_id, float("-inf")) < BUSY_REPLY_INTERVAL:
+            return False
+        if len(self.busy_replied) > 100000:
+            self.busy_replied = {}
+        self.busy_replied[chat_id] = now
+        return True
+
+
+_controller = None
+
+
+def get_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
+
+
+def admitted(kind: str):
+    """
+    Handler decorator: runs the handler under admission control, and tells the user to try
+    again if it is shed.
+        @admitted("photo")
+        async def handle_photo(update, context): ...
+    """
+    def decorate(handler):
+        @functools.wraps(handler)
+        async def wrapper(update, context):
+            controller = get_controller()
+            chat_id = update.effective_chat.id if update.effective_chat else None
+            try:
+                return await controller.run(kind, chat_id, lambda: handler(update, context))
+            except Busy as e:
+                metrics.counter("admission_shed_total").inc(kind=kind, reason=e.reason)
+                if update.callback_query:
+                    await update.callback_query.answer(BUSY_TEXT[:200])
+                elif update.effective_message and controller.should_reply_busy(chat_id):
+                    await update.effective_message.reply_text(BUSY_TEXT)
+        return wrapper
+    return decorate
+
+
+# ⏱️ Spike simulation: python -m tools.admission [--duration 20]
+# 100 typical chats ask a question every ~10 s while 5 spammers send 10 photos a second each;
+# compares typical users' latency with and without admission control.
+if __name__ == "__main__":
+    import random
+    import argparse
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Photo-spam spike with and without admission control")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of traffic")
+    DURATION = parser.parse_args().duration
+
+    WORK = {"text": 1.0, "photo": 2.0}        # seconds of work per request
+    CAPACITY = 32                             # work that fits at once before everything slows down
+    MAX_SLOWDOWN = 8.0                        # upstream timeouts cap how slow overcommitted work gets
+
+    async def simulate(controller):
+        random.seed(0)
+        running = 0
+        latencies = {"text": [], "photo": []}
+        shed = {"text": 0, "photo": 0}
+
+        async def work(kind):
+            nonlocal running
+            running += 1
+            try:
+                # Overcommitted work slows down for everyone (shared CPU / upstream API)
+                await asyncio.sleep(WORK[kind] * min(MAX_SLOWDOWN, max(1.0, running / CAPACITY)))
+            finally:
+                running -= 1
+
+        async def request(kind, chat_id):
+            start = time.perf_counter()
+            try:
+                if controller:
+                    await controller.run(kind, chat_id, lambda: work(kind))
+                else:
+                    await work(kind)
+                latencies[kind].append(time.perf_counter() - start)
+            except Busy:
+                shed[kind] += 1
+
+        async def user(chat_id):
+            while True:
+                arrival = time.perf_counter() + random.expovariate(1 / 10)
+                await asyncio.sleep(min(arrival, end) - time.perf_counter())
+                if arrival >= end:
+                    return
+                tasks.append(asyncio.create_task(request("text", chat_id)))
+
+        async def spammer(chat_id):
+            while time.perf_counter() < end:
+                await asyncio.sleep(0.1)
+                tasks.append(asyncio.create_task(request("photo", chat_id)))
+
+        tasks = []
+        end = time.perf_counter() + DURATION
+        await asyncio.gather(*[user(i) for i in range(100)], *[spammer(1000 + i) for i in range(5)])
+        await asyncio.gather(*tasks)
+        text = np.array(latencies["text"])
+        return (f"typical text p50 {np.percentile(text, 50):.1f}s p95 {np.percentile(text, 95):.1f}s "
+                f"p99 {np.percentile(text, 99):.1f}s ({len(text)} served, {shed['text']} shed); "
+                f"photos served {len(latencies['photo'])}, shed {shed['photo']}")
+
+    print("🚫 no admission control:", asyncio.run(simulate(None)))
+    print("✅ admission control:   ", asyncio.run(simulate(AdmissionController(slots=CAPACITY))))
@@ -0,0 +1,175 @@
+# fake_telegram.py
+# A local stand-in for the Telegram Bot API, for load tests. Point a bot at it with
+#   Bot(token, base_url=server.base_url)
+# It answers getMe / sendMessage (anything else gets a bare ok), records when each message
+# arrived, and can enforce flood limits the way Telegram does (429 + retry_after).
+# For webhook load tests it also plays Telegram's other side: it remembers the URL given to
+# setWebhook and POSTs updates to it over several connections (deliver()).
+import json
+import time
+import threading
+import urllib.request
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeTelegram:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, global_rate: float = None,
+                 chat_rate: float = None, latency: float = 0.0):
+        self.global_rate = global_rate        # messages / second over a sliding 1 s window; None = unlimited
+        self.chat_rate = chat_rate
+        self.latency = latency                # seconds added to every response
+        self.received = []                    # (arrival time, chat_id, text)
+        self.rejected = 0
+        self.recent = deque()
+        self.recent_by_chat = defaultdict(deque)
+        self.lock = threading.Lock()
+        self.message_id = 0
+        self.webhook = None                   # (url, secret token) from setWebhook
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # 🚦 Flood limits
+    @staticmethod
+    def _over(window: deque, rate: float, now: float) -> bool:
+        while window and now - window[0] >= 1.0:
+            window.popleft()
+        return len(window) >= rate
+
+    def _admit(self, chat_id) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            if self.global_rate and self._over(self.recent, self.global_rate, now):
+                return False
+            chat_window = self.recent_by_chat[chat_id]
+            if self.chat_rate and self._over(chat_window, self.chat_rate, now):
+                return False
+            self.recent.append(now)
+            chat_window.append(now)
+            return True
+
+    # 📨 Methods
+    def call(self, method: str, params: dict):
+        """
+        Returns (HTTP status, JSON body) for one Bot API call.
+        """
+        if method == "getMe":
+            return 200, {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}}
+        if method == "setWebhook":
+            self.webhook = (params.get("url"), params.get("secret_token"))
+            return 200, {"ok": True, "result": True}
+        if method == "deleteWebhook":
+            self.webhook = None
+            return 200, {"ok": True, "result": True}
+        if method != "sendMessage":
+            return 200, {"ok": True, "result": True}
+
+        chat_id = int(params.get("chat_id", 0))
+        if not self._admit(chat_id):
+            with self.lock:
+                self.rejected += 1
+            return 429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                         "parameters": {"retry_after": 1}}
+        with self.lock:
+            self.message_id += 1
+            message_id = self.message_id
+            self.received.append((time.time(), chat_id, params.get("text", "")))
+        return 200, {"ok": True, "result": {
+            "message_id": message_id, "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"}, "text": params.get("text", "")
+        }}
+
+    # 📬 Webhook side
+    @staticmethod
+    def message_update(update_id: int, chat_id: int, text: str) -> dict:
+        return {"update_id": update_id, "message": {
+            "message_id": update_id, "date": int(time.time()), "text": text,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"},
+        }}
+
+    def deliver(self, updates: list, connections: int = 40) -> dict:
+        """
+        POSTs updates to the registered webhook over `connections` parallel connections,
+        like Telegram does. A chat always uses the same connection, so each chat's updates
+        arrive in update_id order. Returns {update_id: time posted}.
+        """
+        url, secret = self.webhook
+        headers = {"Content-Type": "application/json"}
+        if secret:
+            headers["X-Telegram-Bot-Api-Secret-Token"] = secret
+        posted = {}
+
+        def post(update):
+            request = urllib.request.Request(url, data=json.dumps(update).encode("utf-8"), headers=headers)
+            posted[update["update_id"]] = time.time()
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+
+        def post_all(shard):
+            for update in shard:
+                post(update)
+
+        shards = defaultdict(list)
+        for update in updates:
+            shards[update["message"]["chat"]["id"] % connections].append(update)
+        with ThreadPoolExecutor(max_workers=connections) as pool:
+            list(pool.map(post_all, shards.values()))
+        return posted
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                content_type = self.headers.get("Content-Type", "")
+                if content_type.startswith("application/json"):
+                    params = json.loads(body or b"{}")
+                else:
+                    params = {k: v[0] for k, v in parse_qs(body.decode("utf-8")).items()}
+                method = self.path.rstrip("/").rsplit("/", 1)[-1]
+                if fake.latency:
+                    time.sleep(fake.latency)
+                status, payload = fake.call(method, params)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+# Standalone: python -m tools.fake_telegram 8081
+if __name__ == "__main__":
+    import sys
+
+    fake = FakeTelegram(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8081, global_rate=30, chat_rate=1)
+    print(f"🧪 Fake Bot API on {fake.base_url}<token>/")
+    fake.server.serve_forever()
@@ -0,0 +1,302 @@
+# metrics.py
+# In-process counters and histograms for the bot's hot paths (pipeline stages, OCR, STT,
+# TTS, reminder dispatch, Telegram API calls, whole updates by message type), exported as
+#   - Prometheus text on http://127.0.0.1:METRICS_PORT/metrics           (METRICS_PORT=9108)
+#   - a JSON summary line every METRICS_LOG_INTERVAL seconds              (METRICS_LOG_INTERVAL=60)
+# plus an optional sampling profiler that writes folded stacks for flame graphs
+# (METRICS_PROFILE_INTERVAL=0.01). All off by default; recording is a lock + a few adds.
+import os
+import sys
+import json
+import time
+import bisect
+import asyncio
+import functools
+import threading
+from collections import Counter as _Tally
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))                         # 0 = no endpoint
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", 0))       # seconds, 0 = no log
+PROFILE_INTERVAL = float(os.getenv("METRICS_PROFILE_INTERVAL", 0))       # seconds between samples, 0 = off
+PROFILE_OUT = os.getenv("METRICS_PROFILE_OUT", "cache/profile.folded")
+PROFILE_FLUSH_EVERY = 60     # seconds between profile writes
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = {}               # name -> Counter / Histogram
+_registry_lock = threading.Lock()
+
+
+def _key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_text(key: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in key] + ([extra] if extra else [])
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        with self.lock:
+            return [f"{self.name}{_label_text(key)} {value:g}" for key, value in sorted(self.values.items())]
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {self.name + _label_text(key): value for key, value in self.values.items()}
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets: tuple = BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.series = {}          # labels -> [per-bucket counts (+Inf last), count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def quantile(self, q: float, counts: list, total: int) -> float:
+        # Linear interpolation inside the bucket holding the q-th observation
+        rank, seen = q * total, 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                low = self.buckets[i - 1] if i else 0.0
+                return low + (self.buckets[i] - low) * (rank - seen) / n
+            seen += n
+        return 0.0
+
+    def render(self) -> list:
+        lines = []
+        with self.lock:
+            series = {key: (list(counts), count, total) for key, (counts, count, total) in self.series.items()}
+        for key, (counts, count, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_label_text(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_label_text(key)} {count}")
+        return lines
+
+    def summary(self) -> dict:
+        with self.lock:
+            series = {key: (list(counts), count, total) for key, (counts, count, total) in self.series.items()}
+        return {
+            self.name + _label_text(key): {
+                "count": count,
+                "mean": round(total / count, 4) if count else 0.0,
+                **{f"p{int(q * 100)}": round(self.quantile(q, counts, count), 4) for q in (0.5, 0.95, 0.99)},
+            }
+            for key, (counts, count, total) in series.items()
+        }
+
+
+def _get(cls, name: str, help: str, **kwargs):
+    metric = _registry.get(name)
+    if metric is None:
+        with _registry_lock:
+            metric = _registry.get(name)
+            if metric is None:
+                metric = _registry[name] = cls(name, help, **kwargs)
+    return metric
+
+
+def counter(name: str, help: str = "") -> Counter:
+    return _get(Counter, name, help)
+
+
+def histogram(name: str, help: str = "", buckets: tuple = BUCKETS) -> Histogram:
+    return _get(Histogram, name, help, buckets=buckets)
+
+
+class timer:
+    """
+    Records elapsed seconds into a histogram, and counts exceptions in <name>_errors_total:
+        with timer("ocr_seconds"): ...
+        @timer("bot_update_seconds", type="text")
+        async def handle_message(update, context): ...
+    """
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        histogram(self.name).observe(time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            counter(self.name.removesuffix("_seconds") + "_errors_total").inc(error=exc_type.__name__, **self.labels)
+        return False
+
+    def __call__(self, fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with timer(self.name, **self.labels):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with timer(self.name, **self.labels):
+                    return fn(*args, **kwargs)
+        return wrapper
+
+
+# 📤 Export
+def render() -> str:
+    """
+    Prometheus text exposition format.
+    """
+    lines = []
+    with _registry_lock:
+        metrics = sorted(_registry.items())
+    for name, metric in metrics:
+        if metric.help:
+            lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def summary() -> dict:
+    result = {}
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        result.update(metric.summary())
+    return result
+
+
+def serve(port: int = METRICS_PORT, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"📈 Metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def _log_loop(interval: float):
+    while True:
+        time.sleep(interval)
+        print("📈 " + json.dumps({"ts": round(time.time()), "metrics": summary()}, ensure_ascii=False))
+
+
+# 🔬 Sampling profiler
+class SamplingProfiler:
+    """
+    Every `interval` seconds, records the stack of every thread (except its own) as a
+    folded "outer;inner;leaf" line. Output loads into flamegraph.pl / speedscope.
+    Python frames only: time inside a C call is attributed to the frame that made it.
+    """
+    def __init__(self, interval: float = PROFILE_INTERVAL, out: str = PROFILE_OUT):
+        self.interval = interval
+        self.out = out
+        self.stacks = _Tally()
+        self.samples = 0
+        self.thread = None
+
+    @staticmethod
+    def _fold(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def sample(self):
+        me = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident != me:
+                self.stacks[self._fold(frame)] += 1
+        self.samples += 1
+
+    def write(self):
+        if os.path.dirname(self.out):
+            os.makedirs(os.path.dirname(self.out), exist_ok=True)
+        tmp = self.out + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        os.replace(tmp, self.out)
+
+    def _run(self):
+        flushed = time.monotonic()
+        while True:
+            time.sleep(self.interval)
+            self.sample()
+            if time.monotonic() - flushed >= PROFILE_FLUSH_EVERY:
+                self.write()
+                flushed = time.monotonic()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="metrics-profiler", daemon=True)
+        self.thread.start()
+        print(f"🔬 Sampling every {self.interval * 1000:.0f} ms into {self.out}")
+        return self
+
+
+_started = False
+
+
+def start(port: int = METRICS_PORT, log_interval: float = METRICS_LOG_INTERVAL,
+          profile_interval: float = PROFILE_INTERVAL):
+    """
+    Starts whichever exporters are configured; safe to call more than once.
+    """
+    global _started
+    if _started:
+        return
+    _started = True
+    if port:
+        serve(port)
+    if log_interval:
+        threading.Thread(target=_log_loop, args=(log_interval,), name="metrics-log", daemon=True).start()
+    if profile_interval:
+        SamplingProfiler(profile_interval).start()
@@ -0,0 +1,104 @@
+# ocr_benchmark.py
+# Throughput + drug-name recognition accuracy of the OCR pipeline over a local image corpus.
+#
+# Corpus layout: a directory of photos plus labels.json = {"image file": "expected brand Name", ...}
+#   python -m tools.ocr_benchmark --corpus Data/ocr_images --workers 1 2 4 --baseline
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+import pytesseract
+
+from rag.name_index import normalize
+from tools.ocr_reader import OCR_LANG, extract_text_from_bytes, recognize_drug
+
+CORPUS_DIR = "Data/ocr_images"
+LABELS_FILE = "labels.json"
+
+
+def baseline_ocr(data: bytes) -> str:
+    # The old pipeline: full resolution, fixed threshold 150
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+    return pytesseract.image_to_string(thresh, lang=OCR_LANG).strip()
+
+
+def _timed(fn, data: bytes):
+    start = time.perf_counter()
+    text = fn(data)
+    return text, time.perf_counter() - start
+
+
+def load_corpus(directory: str) -> list:
+    with open(os.path.join(directory, LABELS_FILE), "r", encoding="utf-8") as f:
+        labels = json.load(f)
+    corpus = []
+    for name, expected in sorted(labels.items()):
+        with open(os.path.join(directory, name), "rb") as f:
+            corpus.append((name, expected, f.read()))
+    return corpus
+
+
+def run(corpus: list, fn, workers: int, name_index) -> dict:
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_timed, [fn] * len(corpus), [data for _, _, data in corpus]))
+    wall = time.perf_counter() - start
+
+    recognized = in_text = 0
+    misses = []
+    for (name, expected, _), (text, _) in zip(corpus, results):
+        target = normalize(expected)
+        hit = recognize_drug(text, name_index)
+        if hit and normalize(hit.key.split("|")[0]) == target:
+            recognized += 1
+        else:
+            misses.append((name, expected, hit.key.split("|")[0] if hit else None))
+        in_text += f" {target} " in f" {normalize(text)} "
+
+    latencies = np.array([seconds for _, seconds in results]) * 1000
+    return {
+        "images": len(corpus),
+        "throughput": len(corpus) / wall,
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+        "recognized": recognized / len(corpus),
+        "name_in_raw_text": in_text / len(corpus),
+        "misses": misses,
+    }
+
+
+def print_result(label: str, workers: int, result: dict, show_misses: int = 5):
+    print(f"{label:<9} workers={workers:<2} {result['throughput']:6.2f} img/s  "
+          f"p50={result['p50']:7.0f} ms  p95={result['p95']:7.0f} ms  "
+          f"recognized={result['recognized']:.1%}  exact name in OCR text={result['name_in_raw_text']:.1%}")
+    for name, expected, got in result["misses"][:show_misses]:
+        print(f"   ✗ {name}: expected {expected!r}, got {got!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark OCR throughput and drug-name recognition")
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--baseline", action="store_true", help="also run the old full-res / threshold-150 pipeline")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.corpus, LABELS_FILE)):
+        print(f"❌ No {LABELS_FILE} in {args.corpus}")
+        sys.exit(1)
+
+    from rag.langchain_pipeline import get_name_index
+    name_index = get_name_index()
+    corpus = load_corpus(args.corpus)
+    print(f"📷 {len(corpus)} images, {len(name_index)} drug names in the dictionary")
+
+    for workers in args.workers:
+        if args.baseline:
+            print_result("baseline", workers, run(corpus, baseline_ocr, workers, name_index))
+        print_result("pipeline", workers, run(corpus, extract_text_from_bytes, workers, name_index))
@@ -1,26 +1,149 @@
-import pytesseract
-from PIL import Image
-import cv2
+# ocr_reader.py
+# OCR for medicine photos: decode from memory, downscale, deskew, Otsu threshold, Tesseract.
+# Recognition runs in a process pool so the bot's event loop never blocks on OpenCV/Tesseract,
+# and recognize_drug() turns the noisy OCR text into one drug name from the dataset.
 import os
+import re
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
-# Set Tesseract executable path (Windows)
-pytesseract.pytesseract.tesseract_cmd = r'C:\\Program Files\\Tesseract-OCR\\tesseract.exe'
+import cv2
+import numpy as np
+import pytesseract
 
-def extract_text_from_image(image_path: str) -> str:
-    try:
-        image = cv2.imread(image_path)
+from rag.name_index import normalize
+from tools import metrics
+from tools.startup import timed
+
+# Tesseract executable: TESSERACT_CMD, else the default Windows install path on Windows, else PATH
+TESSERACT_CMD = os.getenv("TESSERACT_CMD") or (r'C:\\Program Files\\Tesseract-OCR\\tesseract.exe' if os.name == "nt" else None)
+if TESSERACT_CMD:
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+OCR_LANG = 'eng+ben'
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+MAX_SIDE = 1600          # px; phone photos are 3000-4000 px, text stays legible well below that
+MAX_SKEW = 15.0          # degrees; larger "skews" are usually the box edges, not the text
+MIN_SKEW = 0.5
+UNEVEN_LIGHTING = 100    # background brightness range above which a global threshold fails
+OCR_FAILED = "⚠️ OCR failed. Please try again with a clearer image."
+
+# OCR confusions inside mostly-letter words: "SECL0" → "SECLo"; "500mg" is left alone
+_CONFUSIONS = str.maketrans({"0": "o", "1": "l", "5": "s", "|": "l"})
+_WORD_RE = re.compile(r"[a-z0-9|]+", re.IGNORECASE)
 
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
-        # Apply thresholding to clean noise (optional but useful)
-        _, thresh = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+def downscale(gray: np.ndarray, max_side: int = MAX_SIDE) -> np.ndarray:
+    scale = max_side / max(gray.shape[:2])
+    if scale >= 1:
+        return gray
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
 
-        # OCR with English + Bangla
-        text = pytesseract.image_to_string(thresh, lang='eng+ben')
 
-        return text.strip()
+def deskew(gray: np.ndarray) -> np.ndarray:
+    # Angle of the minimum-area rectangle around all dark (text) pixels
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    coords = cv2.findNonZero(ink)
+    if coords is None:
+        return gray
+    angle = cv2.minAreaRect(coords)[-1]
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    if not MIN_SKEW <= abs(angle) <= MAX_SKEW:
+        return gray
+    h, w = gray.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
 
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    # Otsu picks the threshold per image (the old fixed 150 lost text on dark or glossy packs);
+    # strongly uneven lighting (flash glare, shadows) gets a local adaptive threshold instead
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    h, w = blurred.shape
+    background = cv2.blur(blurred, (max(1, w // 8), max(1, h // 8)))
+    if int(background.max()) - int(background.min()) > UNEVEN_LIGHTING:
+        return cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return binary
+
+
+def preprocess(image: np.ndarray) -> np.ndarray:
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return binarize(deskew(downscale(gray)))
+
+
+def ocr_image(image: np.ndarray) -> str:
+    return pytesseract.image_to_string(preprocess(image), lang=OCR_LANG).strip()
+
+
+def extract_text_from_bytes(data: bytes) -> str:
+    # Runs inside the process pool; the photo never touches the disk
+    try:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("could not decode image")
+        return ocr_image(image)
     except Exception as e:
         print(f"[OCR Error] {e}")
-        return "⚠️ OCR failed. Please try again with a clearer image."
+        return OCR_FAILED
+
+
+def extract_text_from_image(image_path: str) -> str:
+    with open(image_path, "rb") as f:
+        return extract_text_from_bytes(f.read())
+
+
+# ⚡ Process pool (created on first use or by warm_up_pool). Workers are spawned, not forked:
+# by then the bot has an event loop, thread pools and held locks that a fork would copy.
+_pool = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def warm_up_pool():
+    # Start every worker now so the first photo doesn't wait for process start + imports
+    with timed("ocr workers"):
+        pool = get_pool()
+        for future in [pool.submit(_worker_ready) for _ in range(OCR_WORKERS)]:
+            future.result()
+
+
+@metrics.timer("ocr_seconds")
+async def extract_text_async(data: bytes) -> str:
+    return await asyncio.get_running_loop().run_in_executor(get_pool(), extract_text_from_bytes, bytes(data))
+
+
+# 💊 Drug-name recognition
+def _fix_word(word: str) -> str:
+    letters = sum(c.isalpha() for c in word)
+    return word.translate(_CONFUSIONS) if letters > len(word) / 2 else word
+
+
+def clean_ocr_text(text: str) -> str:
+    return _WORD_RE.sub(lambda m: _fix_word(m.group(0)), text)
+
+
+def recognize_drug(text: str, name_index, min_score: float = 0.7):
+    """
+    Best drug-name hit (rag.name_index.NameHit) among the OCR tokens, or None.
+    Ties go to the name printed most often — the brand is repeated all over a pack.
+    """
+    cleaned = clean_ocr_text(text)
+    hits = [hit for hit in name_index.lookup(cleaned) if hit.score >= min_score]
+    if not hits:
+        return None
+    normalized = f" {normalize(cleaned)} "
+    return max(hits, key=lambda hit: (hit.score, normalized.count(f" {hit.matched} ")))
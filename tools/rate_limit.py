@@ -0,0 +1,146 @@
+# rate_limit.py
+# Token buckets + a rate-limited Telegram sender with retry and backoff.
+# Telegram allows ~30 messages/s per bot overall and ~1 message/s per chat; going faster
+# only buys 429 "Too Many Requests" responses.
+import os
+import time
+import random
+import asyncio
+from collections import OrderedDict
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+from telegram.request import HTTPXRequest
+
+from tools import metrics
+
+GLOBAL_RATE = float(os.getenv("TELEGRAM_SEND_RATE", 30))     # messages / second, whole bot
+CHAT_RATE = 1.0                                              # messages / second, per chat
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5       # seconds; doubled per attempt, with jitter
+BACKOFF_MAX = 30.0
+MAX_CHAT_BUCKETS = 100000    # per-chat buckets kept before idle ones are evicted
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1.0):
+        # The lock keeps waiters in FIFO order
+        async with self.lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        # Server said "retry after N s": nobody sends until then
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+    def idle(self) -> bool:
+        # Full and nobody waiting: indistinguishable from a brand-new bucket
+        self._refill()
+        return self.tokens >= self.capacity and not self.lock.locked()
+
+
+class ChatBuckets:
+    """
+    chat id -> TokenBucket, created on first use. Past max_size, least recently used buckets
+    are evicted, but only idle ones: dropping a bucket that is refilling or has waiters would
+    hand that chat a fresh full bucket and let it exceed its rate.
+    """
+    def __init__(self, rate: float, capacity: float = None, max_size: int = MAX_CHAT_BUCKETS):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_size = max_size
+        self.buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def get(self, chat_id) -> TokenBucket:
+        bucket = self.buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.buckets[chat_id] = TokenBucket(self.rate, capacity=self.capacity)
+            self._evict()
+        self.buckets.move_to_end(chat_id)
+        return bucket
+
+    def _evict(self):
+        while len(self.buckets) > self.max_size:
+            oldest = next(iter(self.buckets.values()))
+            if not oldest.idle():
+                break      # everything after it was used more recently
+            self.buckets.popitem(last=False)
+
+
+class RateLimitedSender:
+    """
+    send_message(chat_id, text) through a global bucket and a per-chat bucket,
+    retrying RetryAfter (honouring the server's delay) and transient network errors.
+    """
+    def __init__(self, bot, rate: float = GLOBAL_RATE, chat_rate: float = CHAT_RATE, max_retries: int = MAX_RETRIES):
+        self.bot = bot
+        # No burst allowance: a full bucket plus a second of refill would be 2x the limit
+        # in one second, and every 429 stalls all sends for retry_after
+        self.bucket = TokenBucket(rate, capacity=1.0)
+        self.chat_buckets = ChatBuckets(chat_rate, capacity=1.0)
+        self.max_retries = max_retries
+        self.stats = {"sent": 0, "retried": 0, "failed": 0}
+
+    async def send_message(self, chat_id, text: str, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            await self.chat_buckets.get(chat_id).acquire()
+            await self.bucket.acquire()
+            try:
+                message = await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                self.stats["sent"] += 1
+                return message
+            except RetryAfter as e:
+                delay = float(e.retry_after)
+                self.bucket.pause(delay)
+                metrics.counter("telegram_send_retries_total").inc(reason="retry_after")
+            except (BadRequest, Forbidden):
+                # Retrying won't fix a bad request (a NetworkError subclass) or a chat that
+                # blocked the bot
+                self.stats["failed"] += 1
+                raise
+            except (TimedOut, NetworkError) as e:
+                if attempt == self.max_retries:
+                    self.stats["failed"] += 1
+                    raise
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+                metrics.counter("telegram_send_retries_total").inc(reason=type(e).__name__)
+            self.stats["retried"] += 1
+            await asyncio.sleep(delay)
+        self.stats["failed"] += 1
+        raise RuntimeError(f"send_message to {chat_id} still rate-limited after {self.max_retries} retries")
+
+
+class MeteredRequest(HTTPXRequest):
+    """
+    HTTPXRequest that times every Bot API call by method and counts responses by HTTP status
+    (transport exceptions land in telegram_api_errors_total via the timer),
+    e.g. ApplicationBuilder().request(MeteredRequest(connection_pool_size=256)).
+    """
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        with metrics.timer("telegram_api_seconds", method=api_method):
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+        metrics.counter("telegram_api_responses_total").inc(method=api_method, code=code)
+        return code, payload
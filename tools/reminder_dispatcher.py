@@ -0,0 +1,163 @@
+# reminder_dispatcher.py
+# One scheduler task for all reminders instead of one job_queue job each:
+#   - reminders due within the next SCHEDULE_WINDOW seconds sit in a heap keyed by fire time
+#     (loaded from the next_fire index of tools/reminder_store.py, window by window)
+#   - everything due is popped at once and queued to a few sender workers, which drain it
+#     through the token-bucket sender in tools/rate_limit.py (retry + backoff on 429s)
+#   - daily repeats are rolled forward in the same pass with one batched UPDATE
+# Delivery is at-most-once: a reminder is rescheduled / deleted when it is dispatched.
+import time
+import heapq
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from tools import metrics
+from tools.reminder_store import get_store
+
+SCHEDULE_WINDOW = 600        # seconds of upcoming reminders kept in memory
+SEND_WORKERS = 32            # concurrent send_message calls (the token bucket sets the pace)
+MISSED_GRACE = 3600          # one-off reminders missed by up to this much (e.g. bot was down) still fire
+REMINDER_TEXT = "⏰ ওষুধ মনে করিয়ে দিচ্ছি:\n💊 {medicine}"
+
+
+def next_daily_fire(hour: int, minute: int, after: float) -> float:
+    # Next hour:minute strictly after `after` (local time, so it follows DST changes)
+    moment = datetime.fromtimestamp(after)
+    fire = moment.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    while fire.timestamp() <= after:
+        fire += timedelta(days=1)
+    return fire.timestamp()
+
+
+class ReminderDispatcher:
+    def __init__(self, sender, store=None, window: float = SCHEDULE_WINDOW, workers: int = SEND_WORKERS):
+        self.sender = sender
+        self.store = store or get_store()
+        self.window = window
+        self.workers = workers
+        self.heap = []               # (next_fire, reminder id); stale entries are skipped on pop
+        self.entries = {}            # reminder id -> Reminder, for everything in the heap
+        self.loaded_until = 0.0
+        self.queue = asyncio.Queue()
+        self.wakeup = asyncio.Event()
+        self.lags = deque(maxlen=100000)     # seconds between due time and send
+        self.stats = {"dispatched": 0, "delivered": 0, "failed": 0}
+
+    # 📥 Loading
+    def _push(self, reminder):
+        self.entries[reminder.id] = reminder
+        heapq.heappush(self.heap, (reminder.next_fire, reminder.id))
+
+    def _load(self, until: float):
+        for reminder in self.store.due_between(self.loaded_until, until):
+            if reminder.id not in self.entries:
+                self._push(reminder)
+        self.loaded_until = until
+
+    def rehydrate(self):
+        """
+        Startup: fire or roll forward reminders missed while the bot was down, then load
+        the first window.
+        """
+        started = time.perf_counter()
+        now = time.time()
+        rolled, dropped = [], []
+        for reminder in self.store.overdue(now):
+            if now - reminder.next_fire <= MISSED_GRACE:
+                self._push(reminder)
+            elif reminder.repeat:
+                rolled.append((next_daily_fire(reminder.hour, reminder.minute, now), reminder.id))
+            else:
+                dropped.append(reminder.id)
+        self.store.reschedule_many(rolled)
+        self.store.delete_many(dropped)
+        self.loaded_until = now
+        self._load(now + self.window)
+        print(f"⏰ {len(self.store)} reminders stored, {len(self.entries)} in the first window, "
+              f"{len(rolled) + len(dropped)} missed rolled over/dropped in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    # ✏️ Changes from the commands
+    def add(self, reminder):
+        if reminder.next_fire < self.loaded_until:
+            self._push(reminder)
+            self.wakeup.set()
+
+    def cancel_chat(self, chat_id: int) -> int:
+        ids = self.store.delete_chat(chat_id)
+        for reminder_id in ids:
+            self.entries.pop(reminder_id, None)
+        return len(ids)
+
+    # 🔔 Firing
+    def _fire_due(self, now: float):
+        rescheduled, finished = [], []
+        while self.heap and self.heap[0][0] <= now:
+            fire_at, reminder_id = heapq.heappop(self.heap)
+            reminder = self.entries.get(reminder_id)
+            if reminder is None or reminder.next_fire != fire_at:
+                continue         # cancelled, or an older heap entry of a rescheduled reminder
+            self.queue.put_nowait((reminder.chat_id, REMINDER_TEXT.format(medicine=reminder.medicine), fire_at))
+            self.stats["dispatched"] += 1
+            if reminder.repeat:
+                reminder.next_fire = next_daily_fire(reminder.hour, reminder.minute, fire_at)
+                rescheduled.append((reminder.next_fire, reminder.id))
+                if reminder.next_fire < self.loaded_until:
+                    heapq.heappush(self.heap, (reminder.next_fire, reminder.id))
+                else:
+                    del self.entries[reminder.id]     # comes back with a later window
+            else:
+                del self.entries[reminder.id]
+                finished.append(reminder.id)
+        if rescheduled:
+            self.store.reschedule_many(rescheduled)
+        if finished:
+            self.store.delete_many(finished)
+
+    async def _send_worker(self):
+        while True:
+            chat_id, text, due = await self.queue.get()
+            try:
+                await self.sender.send_message(chat_id, text)
+                lag = time.time() - due
+                self.lags.append(lag)
+                self.stats["delivered"] += 1
+                metrics.histogram("reminder_lag_seconds", "Reminder delivery time minus due time").observe(lag)
+                metrics.counter("reminders_total").inc(outcome="delivered")
+            except Exception as e:
+                self.stats["failed"] += 1
+                metrics.counter("reminders_total").inc(outcome="failed")
+                print(f"❌ Reminder to {chat_id} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def run(self):
+        workers = [asyncio.create_task(self._send_worker()) for _ in range(self.workers)]
+        try:
+            while True:
+                now = time.time()
+                if now + self.window / 2 >= self.loaded_until:
+                    self._load(now + self.window)
+                with metrics.timer("reminder_dispatch_seconds"):
+                    self._fire_due(now)
+                metrics.histogram("reminder_queue_depth", "Reminders waiting for a send worker",
+                                  buckets=(0, 10, 100, 1000, 10000, 100000)).observe(self.queue.qsize())
+
+                next_due = self.heap[0][0] if self.heap else float("inf")
+                timeout = max(0.0, min(next_due, self.loaded_until - self.window / 2) - time.time())
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    def lag_report(self) -> dict:
+        if not self.lags:
+            return {}
+        lags = np.array(self.lags)
+        return {f"p{q}": float(np.percentile(lags, q)) for q in (50, 95, 99)} | {"max": float(lags.max())}
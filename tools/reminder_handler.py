@@ -1,11 +1,17 @@
-import asyncio
 from datetime import datetime, timedelta
 from telegram import Update
 from telegram.ext import ContextTypes
 import re
 
-# Dictionary to keep scheduled jobs
-scheduled_reminders = {}
+from tools import metrics
+from tools.rate_limit import RateLimitedSender
+from tools.reminder_store import get_store
+from tools.reminder_dispatcher import ReminderDispatcher
+
+# Reminders live in SQLite (tools/reminder_store.py) and are fired by a single
+# ReminderDispatcher task (tools/reminder_dispatcher.py), which keeps only the next few
+# minutes in memory and sends through the rate-limited sender.
+dispatcher = None
 
 # ✅ Parse time string (like "7:30 PM")
 def parse_time_string(time_str: str) -> datetime:
@@ -20,28 +26,17 @@ def parse_time_string(time_str: str) -> datetime:
         print(f"❌ Time parsing failed: {e}")
         return None
 
-# 🔔 Reminder job
-async def send_reminder(context: ContextTypes.DEFAULT_TYPE):
-    job_data = context.job.data
-    chat_id = job_data["chat_id"]
-    medicine = job_data["medicine"]
-    repeat = job_data.get("repeat", False)
-
-    print(f"🔔 Sending reminder to {chat_id}: {medicine}")
-    await context.bot.send_message(chat_id=chat_id, text=f"⏰ ওষুধ মনে করিয়ে দিচ্ছি:\n💊 {medicine}")
-
-    # Re-schedule for tomorrow if it's a daily reminder
-    if repeat:
-        next_time = datetime.now() + timedelta(days=1)
-        run_time = next_time.replace(hour=job_data['hour'], minute=job_data['minute'], second=0, microsecond=0)
-        context.job_queue.run_once(
-            send_reminder,
-            when=(run_time - datetime.now()).total_seconds(),
-            data=job_data,
-            name=f"reminder_{chat_id}_{medicine}_{run_time.strftime('%H%M')}"
-        )
+def start_reminders(application):
+    """
+    Startup: rehydrate the dispatcher from the store and run it alongside the bot.
+    """
+    global dispatcher
+    dispatcher = ReminderDispatcher(RateLimitedSender(application.bot), get_store())
+    dispatcher.rehydrate()
+    application.create_task(dispatcher.run())
 
 # ✅ /remind command
+@metrics.timer("bot_update_seconds", type="reminder_command")
 async def add_reminder_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         # Join args into full message
@@ -63,26 +58,12 @@ async def add_reminder_command(update: Update, context: ContextTypes.DEFAULT_TYP
             await update.message.reply_text("⚠️ সময় সঠিক ফরম্যাটে দিন (যেমন: 9:00pm)")
             return
 
-        delay = (reminder_time - datetime.now()).total_seconds()
-
-        job_data = {
-            "chat_id": update.message.chat_id,
-            "medicine": medicine,
-            "repeat": repeat,
-            "hour": reminder_time.hour,
-            "minute": reminder_time.minute
-        }
-
-        job_name = f"reminder_{update.message.chat_id}_{medicine}_{reminder_time.strftime('%H%M')}"
-        context.job_queue.run_once(send_reminder, when=delay, data=job_data, name=job_name)
-
-        # Store reminder
-        scheduled_reminders[job_name] = {
-            "user": update.message.chat_id,
-            "medicine": medicine,
-            "time": reminder_time.strftime("%I:%M %p"),
-            "repeat": repeat
-        }
+        # Store reminder; the dispatcher picks it up now if due soon, otherwise with its window
+        reminder = get_store().add(
+            update.message.chat_id, medicine, reminder_time.hour, reminder_time.minute,
+            repeat, reminder_time.timestamp()
+        )
+        dispatcher.add(reminder)
 
         await update.message.reply_text(
             f"✅ মনে করিয়ে দেয়া হবে: {medicine} @ {reminder_time.strftime('%I:%M %p')}" +
@@ -94,9 +75,9 @@ async def add_reminder_command(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("⚠️ মনে করানোর সময় সেট করতে ব্যর্থ। ফরম্যাট ঠিক আছে কিনা দেখুন।")
 
 # 📋 List reminders
+@metrics.timer("bot_update_seconds", type="reminder_command")
 async def list_reminders(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    chat_id = update.message.chat_id
-    user_reminders = [r for r in scheduled_reminders.values() if r["user"] == chat_id]
+    user_reminders = get_store().for_chat(update.message.chat_id)
 
     if not user_reminders:
         await update.message.reply_text("ℹ️ আপনার কোনো রিমাইন্ডার নেই।")
@@ -104,18 +85,15 @@ async def list_reminders(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     msg = "📋 আপনার রিমাইন্ডার তালিকা:\n"
     for i, r in enumerate(user_reminders, 1):
-        repeat_text = " (প্রতিদিন)" if r['repeat'] else ""
-        msg += f"{i}. {r['medicine']} @ {r['time']}{repeat_text}\n"
+        repeat_text = " (প্রতিদিন)" if r.repeat else ""
+        time_text = datetime.fromtimestamp(r.next_fire).strftime("%I:%M %p")
+        msg += f"{i}. {r.medicine} @ {time_text}{repeat_text}\n"
 
     await update.message.reply_text(msg)
 
 # 🧹 Cancel all
+@metrics.timer("bot_update_seconds", type="reminder_command")
 async def cancel_all_reminders(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    chat_id = update.message.chat_id
-    canceled = 0
-    for job in context.job_queue.jobs():
-        if job.data and job.data.get("chat_id") == chat_id:
-            job.schedule_removal()
-            canceled += 1
+    canceled = dispatcher.cancel_chat(update.message.chat_id)
 
     await update.message.reply_text(f"🧹 {canceled} টি রিমাইন্ডার বাতিল করা হয়েছে।")
@@ -0,0 +1,82 @@
+# reminder_loadtest.py
+# Peak-time load test for the reminder dispatcher: N reminders due within one minute
+# (a share of them on the same second, like everyone picking "9:00pm") against the fake
+# Bot API in tools/fake_telegram.py, through the real PTB Bot and rate-limited sender.
+#   python -m tools.reminder_loadtest --reminders 10000 --rate 200
+# Reports delivery lag (arrival at the server - due time), 429s, retries and throughput.
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+import numpy as np
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from tools.fake_telegram import FakeTelegram
+from tools.rate_limit import RateLimitedSender
+from tools.reminder_store import ReminderStore
+from tools.reminder_dispatcher import ReminderDispatcher, SEND_WORKERS
+
+
+def seed(store: ReminderStore, n: int, start: float, span: float, peak: float, chats: int):
+    rows = []
+    for i in range(n):
+        due = start if random.random() < peak else start + random.uniform(0, span)
+        rows.append((random.randrange(chats), f"med {i}", 21, 0, i % 2, due, time.time()))
+    with store.conn:
+        store.conn.executemany(
+            "INSERT INTO reminders (chat_id, medicine, hour, minute, repeat, next_fire, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    return {row[0] for row in rows}
+
+
+async def run(args):
+    random.seed(args.seed)
+    fake = FakeTelegram(global_rate=args.server_rate, chat_rate=1).start()
+    store = ReminderStore(os.path.join(tempfile.mkdtemp(), "loadtest.sqlite"))
+    start = time.time() + args.lead
+    seed(store, args.reminders, start, args.span, args.peak, args.chats)
+
+    request = HTTPXRequest(connection_pool_size=args.workers)
+    bot = Bot("123:loadtest", base_url=fake.base_url, request=request)
+    await bot.initialize()
+    sender = RateLimitedSender(bot, rate=args.rate)
+    dispatcher = ReminderDispatcher(sender, store, workers=args.workers)
+    dispatcher.rehydrate()
+    task = asyncio.create_task(dispatcher.run())
+
+    deadline = start + args.span + args.timeout
+    while dispatcher.stats["delivered"] + dispatcher.stats["failed"] < args.reminders and time.time() < deadline:
+        await asyncio.sleep(0.5)
+    finished = time.time()
+    task.cancel()
+    await bot.shutdown()
+    fake.stop()
+
+    lag = dispatcher.lag_report()
+    arrivals = np.array([t for t, _, _ in fake.received])
+    print(f"📨 {len(fake.received)}/{args.reminders} delivered, {dispatcher.stats['failed']} failed, "
+          f"{fake.rejected} answered 429, {sender.stats['retried']} retries")
+    if len(arrivals):
+        print(f"⏱️ lag p50 {lag['p50']:.2f} s, p95 {lag['p95']:.2f} s, p99 {lag['p99']:.2f} s, max {lag['max']:.2f} s")
+        print(f"🚀 {len(arrivals) / max(arrivals.max() - start, 1e-9):.0f} msg/s from first due time; "
+              f"done {finished - start:.1f} s after it (rate limit {args.rate:g}/s)")
+    print(f"🧠 store left with {len(store)} reminders (daily ones rolled to tomorrow)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reminder fan-out load test against a fake Bot API")
+    parser.add_argument("--reminders", type=int, default=10000)
+    parser.add_argument("--span", type=float, default=60, help="seconds the due times are spread over")
+    parser.add_argument("--peak", type=float, default=0.5, help="share of reminders due on the first second")
+    parser.add_argument("--chats", type=int, default=100000)
+    parser.add_argument("--rate", type=float, default=200, help="sender's global messages/s")
+    parser.add_argument("--server-rate", type=float, default=None, help="fake server's flood limit (messages/s)")
+    parser.add_argument("--workers", type=int, default=SEND_WORKERS)
+    parser.add_argument("--lead", type=float, default=3, help="seconds between start-up and the first due time")
+    parser.add_argument("--timeout", type=float, default=120, help="give up this long after the last due time")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,157 @@
+# reminder_store.py
+# Durable reminder storage (SQLite). Indexed by chat (list / cancel per user) and by
+# next fire time (the scheduler only ever loads the reminders due soon).
+import os
+import sys
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass
+
+REMINDER_DB = os.getenv("REMINDER_DB", "data/reminders.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY,
+    chat_id INTEGER NOT NULL,
+    medicine TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    minute INTEGER NOT NULL,
+    repeat INTEGER NOT NULL,
+    next_fire REAL NOT NULL,      -- unix timestamp
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_chat ON reminders (chat_id, next_fire);
+CREATE INDEX IF NOT EXISTS idx_reminders_next_fire ON reminders (next_fire);
+"""
+
+_COLUMNS = "id, chat_id, medicine, hour, minute, repeat, next_fire"
+
+
+@dataclass
+class Reminder:
+    id: int
+    chat_id: int
+    medicine: str
+    hour: int
+    minute: int
+    repeat: bool
+    next_fire: float
+
+
+class ReminderStore:
+    def __init__(self, path: str = REMINDER_DB):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def _query(self, sql: str, args: tuple = ()) -> list:
+        with self.lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        return [Reminder(i, c, m, h, mi, bool(r), n) for i, c, m, h, mi, r, n in rows]
+
+    def add(self, chat_id: int, medicine: str, hour: int, minute: int, repeat: bool, next_fire: float) -> Reminder:
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO reminders (chat_id, medicine, hour, minute, repeat, next_fire, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (chat_id, medicine, hour, minute, int(repeat), next_fire, time.time())
+            )
+        return Reminder(cursor.lastrowid, chat_id, medicine, hour, minute, repeat, next_fire)
+
+    def get(self, reminder_id: int):
+        rows = self._query(f"SELECT {_COLUMNS} FROM reminders WHERE id = ?", (reminder_id,))
+        return rows[0] if rows else None
+
+    def for_chat(self, chat_id: int) -> list:
+        return self._query(f"SELECT {_COLUMNS} FROM reminders WHERE chat_id = ? ORDER BY next_fire", (chat_id,))
+
+    def due_between(self, start: float, end: float) -> list:
+        """
+        Reminders with start <= next_fire < end, soonest first (range scan on the next_fire index).
+        """
+        return self._query(
+            f"SELECT {_COLUMNS} FROM reminders WHERE next_fire >= ? AND next_fire < ? ORDER BY next_fire",
+            (start, end)
+        )
+
+    def overdue(self, before: float) -> list:
+        return self._query(f"SELECT {_COLUMNS} FROM reminders WHERE next_fire < ? ORDER BY next_fire", (before,))
+
+    def reschedule(self, reminder_id: int, next_fire: float):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE reminders SET next_fire = ? WHERE id = ?", (next_fire, reminder_id))
+
+    def reschedule_many(self, updates: list):
+        """
+        updates: [(next_fire, reminder id), ...] in one transaction.
+        """
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE reminders SET next_fire = ? WHERE id = ?", updates)
+
+    def delete_many(self, reminder_ids: list):
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM reminders WHERE id = ?", [(i,) for i in reminder_ids])
+
+    def delete(self, reminder_id: int):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+
+    def delete_chat(self, chat_id: int) -> list:
+        """
+        Deletes every reminder of a chat and returns their ids.
+        """
+        with self.lock, self.conn:
+            ids = [row[0] for row in self.conn.execute("SELECT id FROM reminders WHERE chat_id = ?", (chat_id,))]
+            self.conn.execute("DELETE FROM reminders WHERE chat_id = ?", (chat_id,))
+        return ids
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM reminders").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ReminderStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ReminderStore()
+        return _store
+
+
+# ⏱️ Benchmark: python -m tools.reminder_store 300000
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    path = os.path.join(tempfile.mkdtemp(), "bench.sqlite")
+    store = ReminderStore(path)
+    now = time.time()
+    rows = [(random.randrange(n // 3 + 1), f"med {i}", 21, 0, i % 2, now + random.uniform(0, 86400), now)
+            for i in range(n)]
+    with store.conn:
+        store.conn.executemany(
+            "INSERT INTO reminders (chat_id, medicine, hour, minute, repeat, next_fire, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    start = time.perf_counter()
+    reopened = ReminderStore(path)
+    window = reopened.due_between(now, now + 600)
+    print(f"📦 {len(reopened)} reminders; first 10-minute window: {len(window)} rows "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    everything = reopened.due_between(0, float("inf"))
+    print(f"📦 full sorted scan: {len(everything)} rows in {(time.perf_counter() - start) * 1000:.0f} ms")
+    start = time.perf_counter()
+    for chat_id in range(1000):
+        reopened.for_chat(chat_id)
+    print(f"👤 per-chat list: {(time.perf_counter() - start):.3f} ms avg")
@@ -0,0 +1,67 @@
+# startup.py
+# Per-component import / initialization timings and readiness flags for the bot.
+# timed() blocks nest (qa_chain loads the retriever, which loads the vectorstore, ...), so the
+# report shows them as a tree with each component's total and its own ("self") time.
+import time
+import threading
+from contextlib import contextmanager
+
+_started = time.perf_counter()
+timings = {}          # component -> seconds, including nested components
+self_timings = {}     # component -> seconds, excluding nested components
+parents = {}          # component -> component it was first timed inside (None at top level)
+ready = set()         # components that finished initializing without raising
+_lock = threading.Lock()
+_local = threading.local()
+
+
+@contextmanager
+def timed(component: str):
+    stack = _local.__dict__.setdefault("stack", [])
+    with _lock:
+        parents.setdefault(component, stack[-1][0] if stack else None)
+    frame = [component, 0.0]          # [component, seconds spent in nested components]
+    stack.append(frame)
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        if stack:
+            stack[-1][1] += elapsed
+        with _lock:
+            timings[component] = timings.get(component, 0.0) + elapsed
+            self_timings[component] = self_timings.get(component, 0.0) + elapsed - frame[1]
+            if ok:
+                ready.add(component)
+
+
+def is_ready(*components) -> bool:
+    with _lock:
+        return all(c in ready for c in components)
+
+
+def report() -> str:
+    with _lock:
+        rows = {c: (timings[c], self_timings[c], c in ready) for c in timings}
+        tree = {c: parents.get(c) for c in rows}
+    lines = [f"⏱️ Startup report ({time.perf_counter() - _started:.1f}s since launch)",
+             f"  {'component':<28}{'total':>9}{'self':>9}"]
+
+    def add(parent, depth):
+        children = sorted((c for c, p in tree.items() if p == parent), key=lambda c: -rows[c][0])
+        for component in children:
+            total, own, ok = rows[component]
+            name = "  " * depth + component
+            lines.append(f"  {name:<28}{total * 1000:>6.0f} ms{own * 1000:>6.0f} ms" + ("" if ok else "  ❌ failed"))
+            add(component, depth + 1)
+
+    # Components whose parent never finished (e.g. still loading) show at the top level
+    for component, parent in tree.items():
+        if parent is not None and parent not in rows:
+            tree[component] = None
+    add(None, 0)
+    return "\n".join(lines)
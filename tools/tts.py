@@ -0,0 +1,223 @@
+# tts.py
+# Text-to-speech service for voice replies:
+#   - synthesis runs in a process pool, each worker owning its own pyttsx3 engine (not thread-safe)
+#   - output is OGG/Opus, the format Telegram voice notes use, so no conversion on upload
+#   - audio is cached on disk by content hash, and the Telegram file_id of an uploaded
+#     clip is remembered, so a repeated answer costs neither synthesis nor upload
+import io
+import os
+import json
+import asyncio
+import hashlib
+import tempfile
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from tools import metrics
+from tools.startup import timed
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "cache/tts")
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", 2))
+TTS_CACHE_MAX_FILES = int(os.getenv("TTS_CACHE_MAX_FILES", 5000))
+PRUNE_EVERY = 100          # cache writes between size checks
+CACHE_VERSION = 1          # part of the cache key; bump when voices or encoding change
+OPUS_BITRATE = "32k"
+FILE_IDS = "file_ids.json"
+
+# ⚙️ Worker side (runs inside the process pool)
+_engine = None
+
+
+def _pyttsx3_engine():
+    # One engine per worker process, created on first use
+    global _engine
+    if _engine is None:
+        import pyttsx3
+        engine = pyttsx3.init()
+        engine.setProperty('rate', 150)
+        engine.setProperty('volume', 1.0)
+
+        # Set English voice
+        for voice in engine.getProperty('voices'):
+            if 'english' in voice.name.lower():
+                engine.setProperty('voice', voice.id)
+                break
+        _engine = engine
+    return _engine
+
+
+def warm_worker() -> int:
+    _pyttsx3_engine()
+    return os.getpid()
+
+
+def to_ogg_opus(segment) -> bytes:
+    buffer = io.BytesIO()
+    segment.set_channels(1).set_frame_rate(48000).export(buffer, format="ogg", codec="libopus", bitrate=OPUS_BITRATE)
+    return buffer.getvalue()
+
+
+def synthesize(text: str, language: str) -> bytes:
+    from pydub import AudioSegment
+
+    if language == 'bn':
+        from gtts import gTTS
+        mp3 = io.BytesIO()
+        gTTS(text=text, lang='bn').write_to_fp(mp3)
+        mp3.seek(0)
+        segment = AudioSegment.from_file(mp3, format="mp3")
+    else:
+        # pyttsx3 can only render to a file; it lives just long enough to be re-encoded
+        fd, wav_path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            engine = _pyttsx3_engine()
+            engine.save_to_file(text, wav_path)
+            engine.runAndWait()
+            segment = AudioSegment.from_file(wav_path)
+        finally:
+            os.unlink(wav_path)
+    return to_ogg_opus(segment)
+
+
+# 🔊 Service (bot side)
+class TTSService:
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, workers: int = TTS_WORKERS, synthesize_fn=synthesize):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.synthesize_fn = synthesize_fn
+        self.pool = None
+        self.inflight = {}           # cache key -> Future; identical concurrent answers synthesize once
+        self.writes = 0
+        self.stats = {"file_id": 0, "disk": 0, "synthesized": 0, "shared": 0}
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.file_ids = self._load_file_ids()
+
+    @staticmethod
+    def language(language: str) -> str:
+        return 'bn' if language.startswith('bn') else 'en'
+
+    @staticmethod
+    def cache_key(text: str, language: str) -> str:
+        return hashlib.sha256(f"{CACHE_VERSION}|{language}|{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.ogg")
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.pool is None:
+                # Spawned, not forked: the bot's threads and held locks must not leak into workers
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self.pool
+
+    def warm_up(self):
+        # Start the workers and load a pyttsx3 engine in each of them
+        with timed("pyttsx3"):
+            pool = self._get_pool()
+            for future in [pool.submit(warm_worker) for _ in range(self.workers)]:
+                future.result()
+
+    # Telegram file_id cache
+    def _load_file_ids(self) -> dict:
+        path = os.path.join(self.cache_dir, FILE_IDS)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_file_ids(self):
+        path = os.path.join(self.cache_dir, FILE_IDS)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.file_ids, f)
+        os.replace(tmp, path)
+
+    def remember_file_id(self, key: str, file_id: str):
+        with self.lock:
+            self.file_ids[key] = file_id
+            self._save_file_ids()
+
+    def forget_file_id(self, key: str):
+        with self.lock:
+            if self.file_ids.pop(key, None) is not None:
+                self._save_file_ids()
+
+    # Disk cache (file mtime = last use, for pruning)
+    def _touch(self, key: str):
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _read(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path)
+            return audio
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, audio: bytes):
+        path = self._path(key)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, path)
+        self.writes += 1
+        if self.writes % PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self):
+        files = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".ogg")]
+        if len(files) <= TTS_CACHE_MAX_FILES:
+            return
+        files.sort(key=lambda e: e.stat().st_mtime)
+        for entry in files[:len(files) - TTS_CACHE_MAX_FILES]:
+            os.remove(entry.path)
+            self.forget_file_id(entry.name[:-len(".ogg")])
+
+    def _served(self, source: str, start: float):
+        self.stats[source] += 1
+        metrics.histogram("tts_seconds", "Voice reply latency by where the audio came from").observe(
+            time.perf_counter() - start, source=source)
+
+    async def speak(self, text: str, language: str = 'en'):
+        """
+        Returns (cache key, OGG/Opus bytes or None, Telegram file_id or None).
+        A known file_id means the clip can be re-sent without uploading anything.
+        """
+        start = time.perf_counter()
+        language = self.language(language)
+        key = self.cache_key(text, language)
+        file_id = self.file_ids.get(key)
+        if file_id:
+            # Clips re-sent by file_id are the popular ones: keep their audio from being pruned,
+            # or the file_id is forgotten with it and the clip gets synthesized again
+            self._touch(key)
+            self._served("file_id", start)
+            return key, None, file_id
+
+        audio = await asyncio.to_thread(self._read, key)
+        if audio:
+            self._served("disk", start)
+            return key, audio, None
+
+        future = self.inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_pool(), self.synthesize_fn, text, language)
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+            audio = await future
+            await asyncio.to_thread(self._write, key, audio)
+            self._served("synthesized", start)
+        else:
+            audio = await future
+            self._served("shared", start)
+        return key, audio, None
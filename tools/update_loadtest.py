@@ -0,0 +1,108 @@
+# update_loadtest.py
+# Webhook throughput test: the fake Bot API in tools/fake_telegram.py posts N text updates
+# from C chats to a PTB Application in webhook mode, whose handler waits like a pipeline call
+# (random 0..2x --handler-ms) and replies with the update id. Compares update processors:
+#   sequential – PTB default, one update at a time
+#   simple     – concurrent_updates(n), no ordering
+#   per-chat   – bot/update_processor.PerChatUpdateProcessor(n)
+#   python -m tools.update_loadtest --updates 2000 --chats 200 --processor sequential per-chat
+# Reports updates/s, reply latency (reply received - update posted) and per-chat order violations.
+import time
+import random
+import asyncio
+import argparse
+
+import numpy as np
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+from telegram.request import HTTPXRequest
+
+from bot.update_processor import PerChatUpdateProcessor
+from tools.fake_telegram import FakeTelegram
+
+PROCESSORS = ("sequential", "simple", "per-chat")
+
+
+def build_application(fake: FakeTelegram, processor: str, concurrency: int, handler_ms: float):
+    async def handle(update, context):
+        await asyncio.sleep(random.uniform(0, 2 * handler_ms / 1000))
+        await update.message.reply_text(update.message.text)
+
+    concurrent = {
+        "sequential": False,
+        "simple": concurrency,
+        "per-chat": PerChatUpdateProcessor(concurrency),
+    }[processor]
+    application = (
+        ApplicationBuilder().token("123:loadtest").base_url(fake.base_url)
+        .request(HTTPXRequest(connection_pool_size=max(8, concurrency)))
+        .concurrent_updates(concurrent)
+        .build()
+    )
+    application.add_handler(MessageHandler(filters.TEXT, handle))
+    return application
+
+
+def order_violations(received: list) -> int:
+    # Replies of one chat must come back in update_id order
+    last, violations = {}, 0
+    for _, chat_id, text in received:
+        update_id = int(text)
+        if update_id < last.get(chat_id, -1):
+            violations += 1
+        last[chat_id] = max(update_id, last.get(chat_id, -1))
+    return violations
+
+
+async def run(processor: str, args, port: int) -> dict:
+    random.seed(args.seed)
+    fake = FakeTelegram().start()
+    application = build_application(fake, processor, args.concurrency, args.handler_ms)
+    updates = [FakeTelegram.message_update(i, random.randrange(args.chats), str(i)) for i in range(args.updates)]
+
+    async with application:
+        await application.updater.start_webhook(
+            listen="127.0.0.1", port=port, url_path="webhook",
+            webhook_url=f"http://127.0.0.1:{port}/webhook", secret_token="loadtest",
+        )
+        await application.start()
+
+        started = time.time()
+        posted = await asyncio.to_thread(fake.deliver, updates, args.connections)
+        while len(fake.received) < len(updates) and time.time() - started < args.timeout:
+            await asyncio.sleep(0.05)
+        elapsed = max(t for t, _, _ in fake.received) - started if fake.received else float("nan")
+
+        await application.updater.stop()
+        await application.stop()
+    fake.stop()
+
+    latency = np.array([t - posted[int(text)] for t, _, text in fake.received]) * 1000
+    return {
+        "processor": processor,
+        "replied": len(fake.received),
+        "updates_per_s": len(fake.received) / elapsed,
+        **{f"p{q}_ms": float(np.percentile(latency, q)) for q in (50, 95, 99)},
+        "order_violations": order_violations(fake.received),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Webhook update throughput against a fake Bot API")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--processor", nargs="+", choices=PROCESSORS, default=list(PROCESSORS))
+    parser.add_argument("--concurrency", type=int, default=64, help="max updates in progress at once")
+    parser.add_argument("--connections", type=int, default=40, help="parallel webhook connections (Telegram: 1-100)")
+    parser.add_argument("--handler-ms", type=float, default=50, help="mean simulated handler time")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = [asyncio.run(run(processor, args, args.port)) for processor in args.processor]
+    print(f"\n📊 {args.updates} updates from {args.chats} chats, handler ~{args.handler_ms:g} ms, "
+          f"concurrency {args.concurrency}")
+    print(f"{'processor':<12}{'replied':>9}{'upd/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'out of order':>14}")
+    for r in rows:
+        print(f"{r['processor']:<12}{r['replied']:>9}{r['updates_per_s']:>9.0f}{r['p50_ms']:>9.0f}"
+              f"{r['p95_ms']:>9.0f}{r['p99_ms']:>9.0f}{r['order_violations']:>14}")
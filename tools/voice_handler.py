@@ -1,86 +1,114 @@
 import speech_recognition as sr
-from gtts import gTTS
-import pyttsx3
 from pydub import AudioSegment
+import io
 import os
-import tempfile
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from rag.lang_detect import detect_language
+from tools.tts import TTSService
+from tools import metrics
 
-class VoiceHandler:
+STT_BACKEND = os.getenv("STT_BACKEND", "google")    # google | stub
+STT_WORKERS = int(os.getenv("STT_WORKERS", 8))      # decode (ffmpeg) + recognition HTTP calls
+STT_LANGUAGES = ('bn-BD', 'en-US')                  # tried concurrently, preferred in this order
+SAMPLE_RATE = 16000
+
+
+# 🎙️ Recognizers: recognize(audio, language) -> transcript, raises sr.UnknownValueError if nothing heard
+class GoogleRecognizer:
     def __init__(self):
-        print("🎤 Initializing Voice Handler...")
         self.recognizer = sr.Recognizer()
-        self.tts_engine = pyttsx3.init()
-        self.tts_engine.setProperty('rate', 150)
-        self.tts_engine.setProperty('volume', 1.0)
 
-        # Set English voice
-        voices = self.tts_engine.getProperty('voices')
-        for voice in voices:
-            if 'english' in voice.name.lower():
-                self.tts_engine.setProperty('voice', voice.id)
-                break
+    def recognize(self, audio: sr.AudioData, language: str) -> str:
+        return self.recognizer.recognize_google(audio, language=language)
+
+
+class StubRecognizer:
+    """
+    Canned transcripts per language, for tests and offline runs.
+    """
+    def __init__(self, transcripts: dict = None, delay: float = 0.0):
+        self.transcripts = transcripts or {}
+        self.delay = delay
+        self.calls = []
+
+    def recognize(self, audio: sr.AudioData, language: str) -> str:
+        self.calls.append(language)
+        time.sleep(self.delay)
+        text = self.transcripts.get(language)
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+def make_recognizer(backend: str = STT_BACKEND):
+    return StubRecognizer() if backend == "stub" else GoogleRecognizer()
+
+
+def decode_voice(data: bytes) -> sr.AudioData:
+    # Telegram voice notes are OGG/Opus; decode + resample to 16 kHz mono PCM without touching disk
+    audio = AudioSegment.from_file(io.BytesIO(data), format="ogg")
+    audio = audio.set_channels(1).set_frame_rate(SAMPLE_RATE).set_sample_width(2)
+    return sr.AudioData(audio.raw_data, SAMPLE_RATE, 2)
 
-        print("✅ VoiceHandler initialized!")
 
-    def convert_ogg_to_wav(self, ogg_path: str) -> str:
+class VoiceHandler:
+    def __init__(self, recognizer=None):
+        self.recognizer = recognizer or make_recognizer()
+        self.stt_executor = ThreadPoolExecutor(max_workers=STT_WORKERS, thread_name_prefix="stt")
+        self.tts = TTSService()
+
+    def warm_up(self):
+        self.tts.warm_up()
+
+    def _recognize(self, audio: sr.AudioData, language: str) -> str:
         try:
-            if not os.path.exists(ogg_path):
-                return None
-            audio = AudioSegment.from_file(ogg_path, format="ogg")
-            audio = audio.set_channels(1).set_frame_rate(16000)
-            wav_path = ogg_path.replace('.ogg', '.wav')
-            audio.export(wav_path, format='wav')
-            return wav_path if os.path.exists(wav_path) else None
+            return self.recognizer.recognize(audio, language).strip()
+        except sr.UnknownValueError:
+            return ""
         except Exception as e:
-            print(f"❌ Conversion error: {e}")
-            return None
+            print(f"❌ STT error ({language}): {e}")
+            return ""
 
-    def speech_to_text(self, audio_file_path: str, return_lang: bool = False):
+    async def speech_to_text(self, data: bytes, languages: tuple = STT_LANGUAGES):
         """
-        Converts speech to text. If return_lang=True, also returns detected language code.
+        Voice note bytes → (text, language code), or (None, None).
+        All languages are recognized at once; the first non-empty one in preference order wins,
+        so a Bangla hit returns without waiting for the English attempt.
         """
+        loop = asyncio.get_running_loop()
         try:
-            if audio_file_path.endswith('.ogg'):
-                audio_file_path = self.convert_ogg_to_wav(audio_file_path)
-                if not audio_file_path:
-                    return (None, None) if return_lang else None
-
-            with sr.AudioFile(audio_file_path) as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio = self.recognizer.listen(source)
-
-            # Try Bangla first, then English
-            for lang_code in ['bn-BD', 'en-US']:
-                try:
-                    text = self.recognizer.recognize_google(audio, language=lang_code)
-                    if text.strip():
-                        return (text.strip(), lang_code) if return_lang else text.strip()
-                except:
-                    continue
-
-            return (None, None) if return_lang else None
+            with metrics.timer("stt_seconds", step="decode"):
+                audio = await loop.run_in_executor(self.stt_executor, decode_voice, bytes(data))
         except Exception as e:
-            print(f"❌ STT error: {e}")
-            return (None, None) if return_lang else None
+            print(f"❌ Conversion error: {e}")
+            return None, None
 
-    def text_to_speech(self, text: str, language: str = 'en') -> str:
+        with metrics.timer("stt_seconds", step="recognize"):
+            attempts = [loop.run_in_executor(self.stt_executor, self._recognize, audio, lang) for lang in languages]
+            for attempt in attempts:
+                text = await attempt
+                if text:
+                    # bn-BD also transcribes English speech; trust the script of the transcript
+                    language = 'bn-BD' if detect_language(text) == 'bn' else 'en-US'
+                    metrics.counter("stt_results_total").inc(result=language)
+                    return text, language
+        metrics.counter("stt_results_total").inc(result="none")
+        return None, None
+
+    async def text_to_speech(self, text: str, language: str = 'en'):
         """
-        Generates speech based on detected language.
+        Voice reply for text → (cache key, OGG/Opus bytes, Telegram file_id); audio or file_id
+        may be None, all three are None on failure. See tools/tts.py.
         """
         try:
-            temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-            temp_audio_path = temp_audio.name
-            temp_audio.close()
-
-            if language.startswith('bn'):
-                gTTS(text=text, lang='bn').save(temp_audio_path)
-            else:
-                self.tts_engine.save_to_file(text, temp_audio_path)
-                self.tts_engine.runAndWait()
-
-            return temp_audio_path if os.path.exists(temp_audio_path) else None
+            return await self.tts.speak(text, language)
         except Exception as e:
             print(f"❌ TTS error: {e}")
-            return None
+            return None, None, None
+
+    def remember_voice(self, key: str, file_id: str):
+        self.tts.remember_file_id(key, file_id)
 
 voice_handler = VoiceHandler()